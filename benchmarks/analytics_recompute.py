@@ -0,0 +1,74 @@
+"""Full-recompute benchmark for the assignment analytics summaries.
+
+Builds synthetic column arrays (assignment, student, question, marks) and
+times services.analytics.compute_stats on them, next to a plain-Python
+per-row loop for reference:
+
+    python -m benchmarks.analytics_recompute --responses 1000000 --assignments 500
+"""
+import argparse
+import time
+from collections import defaultdict
+import numpy as np
+from services.analytics import compute_stats
+
+
+def synthetic_columns(responses: int, assignments: int, questions_per_assignment: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    students_per_assignment = max(1, responses // (assignments * questions_per_assignment))
+    assignment_ids = np.repeat(np.arange(1, assignments + 1), students_per_assignment * questions_per_assignment)
+    student_ids = np.tile(np.repeat(np.arange(1, students_per_assignment + 1), questions_per_assignment), assignments)
+    question_offsets = np.tile(np.arange(questions_per_assignment), assignments * students_per_assignment)
+    question_ids = (assignment_ids - 1) * questions_per_assignment + question_offsets + 1
+    marks = rng.integers(0, 6, size=len(assignment_ids))
+    return assignment_ids, student_ids, question_ids, marks
+
+
+def python_loop(assignment_ids, student_ids, question_ids, marks):
+    totals = defaultdict(float)
+    for a, s, m in zip(assignment_ids.tolist(), student_ids.tolist(), marks.tolist()):
+        totals[(a, s)] += m
+    question_sums = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0.0, 0.0])
+    for a, s, q, m in zip(assignment_ids.tolist(), student_ids.tolist(), question_ids.tolist(), marks.tolist()):
+        t = totals[(a, s)]
+        sums = question_sums[q]
+        sums[0] += 1
+        sums[1] += m
+        sums[2] += m * m
+        sums[3] += t
+        sums[4] += t * t
+        sums[5] += m * t
+    return totals, question_sums
+
+
+def timed(fn, *args, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--responses", type=int, default=1_000_000)
+    parser.add_argument("--assignments", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=10, help="questions per assignment")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-python", action="store_true", help="don't time the per-row reference loop")
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.responses, args.assignments, args.questions)
+    print(f"responses={len(columns[0])} assignments={args.assignments} questions/assignment={args.questions}")
+
+    vectorized = timed(compute_stats, *columns, repeat=args.repeat)
+    print(f"{'numpy compute_stats':<22} {vectorized * 1000:>9.1f} ms  {len(columns[0]) / vectorized / 1e6:>6.2f} M rows/s")
+    if not args.skip_python:
+        looped = timed(python_loop, *columns, repeat=1)
+        print(f"{'python per-row loop':<22} {looped * 1000:>9.1f} ms  {len(columns[0]) / looped / 1e6:>6.2f} M rows/s")
+        print(f"speedup x{looped / vectorized:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Hit-rate and latency benchmark for the student chat semantic cache.
+
+Replays a class's worth of paraphrased questions through SemanticCache in
+front of a fake model with fixed latency, and reports hit rate, false
+hits (answers served for a different topic) and time saved. Part of the
+questions are equations that differ only in their numbers, which must never
+share an answer; the run fails when precision drops below --min-precision:
+
+    python -m benchmarks.chat_cache --students 40 --model-latency 1.5 --embedder hashing
+"""
+import argparse
+import asyncio
+import random
+import time
+from services.semantic_cache import SemanticCache, build_embedder
+
+TOPICS = ["photosynthesis", "gravity", "fractions", "the water cycle", "volcanoes", "magnetism", "the solar system", "digestion"]
+TEMPLATES = [
+    "What is {t}?",
+    "what is {t}",
+    "Explain {t} simply",
+    "Can you explain {t}?",
+    "Please tell me what {t} is",
+    "Explain {t} in simple words",
+    "How does {t} work?",
+    "Why is {t} important?",
+]
+# near misses: same wording, different numbers, so a different answer
+EQUATIONS = ["2x+3=7", "2x+3=9", "2x+5=7", "3x-4=11", "3x-4=14", "x/2=6", "x/3=6"]
+EQUATION_TEMPLATES = ["Solve {t}", "solve {t}", "How do I solve {t}?", "Can you solve {t}"]
+
+
+async def replay(cache: SemanticCache, questions, model_latency: float):
+    latencies, false_hits = [], 0
+    for topic, question in questions:
+        started = time.perf_counter()
+        answer, _, vector = await cache.lookup("student", "7", question)
+        if answer is None:
+            await asyncio.sleep(model_latency)
+            cache.store("student", "7", question, f"answer about {topic}", vector, model_latency)
+        elif answer != f"answer about {topic}":
+            false_hits += 1
+        latencies.append(time.perf_counter() - started)
+    return latencies, false_hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--questions-per-student", type=int, default=3)
+    parser.add_argument("--model-latency", type=float, default=1.5, help="seconds per simulated model call")
+    parser.add_argument("--embedder", default="auto", choices=["auto", "hashing", "transformers"])
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--equation-share", type=float, default=0.25, help="share of questions that are equations")
+    parser.add_argument("--min-precision", type=float, default=0.99, help="exit non-zero below this share of correct hits")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    questions = []
+    for _ in range(args.students * args.questions_per_student):
+        if rng.random() < args.equation_share:
+            equation = rng.choice(EQUATIONS)
+            questions.append((equation, rng.choice(EQUATION_TEMPLATES).format(t=equation)))
+        else:
+            topic = rng.choice(TOPICS)
+            questions.append((topic, rng.choice(TEMPLATES).format(t=topic)))
+
+    cache = SemanticCache(embedder=build_embedder(args.embedder), threshold=args.threshold)
+    started = time.perf_counter()
+    latencies, false_hits = asyncio.run(replay(cache, questions, args.model_latency))
+    elapsed = time.perf_counter() - started
+    stats = cache.stats()
+    uncached = len(questions) * args.model_latency
+    precision = (stats["hits"] - false_hits) / stats["hits"] if stats["hits"] else 1.0
+
+    print(f"embedder={stats['embedder']} threshold={stats['threshold']} questions={len(questions)}")
+    print(f"hit rate      {stats['hit_rate']:.1%}  ({stats['hits']} hits, {stats['misses']} model calls)")
+    print(f"false hits    {false_hits}  (precision {precision:.1%})")
+    print(f"avg hit       {stats['avg_hit_ms']:.2f} ms" if stats["avg_hit_ms"] is not None else "avg hit       -")
+    print(f"total time    {elapsed:.1f} s vs {uncached:.1f} s without the cache ({1 - elapsed / uncached:.0%} saved)")
+    if precision < args.min_precision:
+        raise SystemExit(f"precision {precision:.1%} is below --min-precision {args.min_precision:.0%}")
+
+
+if __name__ == "__main__":
+    main()
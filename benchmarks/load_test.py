@@ -0,0 +1,343 @@
+"""Offline load test: scripted school-day scenarios against the whole app.
+
+Drives the FastAPI app in-process over httpx's ASGI transport (or a running
+server with --base-url) against a database seeded by benchmarks.seed_dataset.
+In-process runs swap Gemini for FakeBackend with the given latency, jitter and
+429 rate. Reports p50/p95/p99 latency, throughput and errors per route and
+writes them to a JSON file that a later run can --compare against:
+
+    python -m benchmarks.seed_dataset --database-url sqlite:///bench.db
+    python -m benchmarks.load_test --database-url sqlite:///bench.db --out before.json
+    python -m benchmarks.load_test --database-url sqlite:///bench.db --out after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+import httpx
+from benchmarks.chat_cache import TEMPLATES, TOPICS
+from benchmarks.login_throughput import percentile
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.windows = {}  # route -> (first request start, last response end)
+        self.scenario_of = {}
+
+    async def call(self, client: httpx.AsyncClient, scenario: str, route: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        ended = time.perf_counter()
+        self.latencies[route].append(ended - started)
+        self.statuses[route][status] += 1
+        first, last = self.windows.get(route, (started, ended))
+        self.windows[route] = (min(first, started), max(last, ended))
+        self.scenario_of[route] = scenario
+        return response
+
+    def route_report(self, route: str) -> dict:
+        latencies = self.latencies[route]
+        first, last = self.windows[route]
+        errors = sum(n for status, n in self.statuses[route].items() if not status.startswith(("2", "3")))
+        return {
+            "scenario": self.scenario_of[route],
+            "requests": len(latencies),
+            "errors": errors,
+            "statuses": dict(self.statuses[route]),
+            "throughput_rps": round(len(latencies) / max(last - first, 1e-9), 2),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2),
+        }
+
+
+async def run_concurrently(jobs, concurrency: int):
+    pending = iter(jobs)
+
+    async def worker():
+        for job in pending:
+            await job()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+
+def load_sample(db, count: int, rng: random.Random) -> list:
+    """Random seeded students with a token, their class and that class's newest assignment."""
+    from sqlalchemy import func, select
+    import models
+    from services.auth import create_access_token, load_role_claims
+
+    max_id = db.scalar(select(func.max(models.Student.id))) or 0
+    if not max_id:
+        raise SystemExit("no students in the database; run benchmarks.seed_dataset first")
+    ids = rng.sample(range(1, max_id + 1), min(count, max_id))
+    rows = db.execute(
+        select(models.User.id, models.User.email, models.Student.id, models.Student.class_id)
+        .join(models.Student, models.Student.user_id == models.User.id)
+        .where(models.Student.id.in_(ids), models.Student.class_id.isnot(None))
+    ).all()
+    class_ids = {row[3] for row in rows}
+    newest = dict(db.execute(
+        select(models.Assignment.class_id, func.max(models.Assignment.id))
+        .where(models.Assignment.class_id.in_(class_ids))
+        .group_by(models.Assignment.class_id)
+    ).all())
+    questions = defaultdict(list)
+    for assignment_id, question_id in db.execute(
+        select(models.AssignmentQuestion.assignment_id, models.AssignmentQuestion.id)
+        .where(models.AssignmentQuestion.assignment_id.in_(set(newest.values())))
+    ):
+        questions[assignment_id].append(question_id)
+
+    sample = []
+    for user_id, email, student_id, class_id in rows:
+        claims = load_role_claims(db, user_id)
+        token = create_access_token(data={"sub": email, "user_id": user_id, "role": "student", **claims})
+        assignment_id = newest.get(class_id)
+        sample.append({
+            "user_id": user_id,
+            "email": email,
+            "student_id": student_id,
+            "class_id": class_id,
+            "headers": {"Authorization": f"Bearer {token}"},
+            "assignment_id": assignment_id,
+            "question_ids": questions.get(assignment_id, []),
+        })
+    return sample
+
+
+def gradable_assignments(db, count: int) -> list:
+    from sqlalchemy import select
+    import models
+
+    return list(db.scalars(
+        select(models.StudentResponse.assignment_id)
+        .join(models.Assignment, models.Assignment.id == models.StudentResponse.assignment_id)
+        .where(
+            models.Assignment.assignment_type == models.AssignmentType.description,
+            models.StudentResponse.obtained_marks.is_(None),
+        )
+        .distinct()
+        .limit(count)
+    ))
+
+
+async def login_rush(ctx):
+    password = ctx["password"]
+
+    def job(student):
+        return lambda: ctx["recorder"].call(
+            ctx["client"], "login_rush", "POST /auth/login", "POST", "/auth/login",
+            json={"email": student["email"], "password": password},
+        )
+
+    await run_concurrently([job(s) for s in ctx["students"][:ctx["args"].logins]], ctx["args"].concurrency)
+
+
+async def assignment_fetch(ctx):
+    recorder, client = ctx["recorder"], ctx["client"]
+
+    def job(student):
+        async def visit():
+            # what the student app loads on open: list, dashboard, then one assignment
+            await recorder.call(client, "assignment_fetch", "GET /students/{user_id}/assignments", "GET",
+                                f"/students/{student['user_id']}/assignments", headers=student["headers"])
+            await recorder.call(client, "assignment_fetch", "GET /students/{user_id}/dashboard", "GET",
+                                f"/students/{student['user_id']}/dashboard", headers=student["headers"])
+            if student["assignment_id"]:
+                await recorder.call(client, "assignment_fetch", "GET /students/{assignment_id}/questions", "GET",
+                                    f"/students/{student['assignment_id']}/questions", headers=student["headers"])
+        return visit
+
+    await run_concurrently([job(s) for s in ctx["students"][:ctx["args"].fetches]], ctx["args"].concurrency)
+
+
+async def submission_burst(ctx):
+    rng = ctx["rng"]
+
+    def job(student):
+        answers = [{"question_id": q, "response": f"Option {rng.choice('ABCD')}"} for q in student["question_ids"]]
+        return lambda: ctx["recorder"].call(
+            ctx["client"], "submission_burst", "POST /students/student_responses/", "POST", "/students/student_responses/",
+            data={
+                "assignment_id": str(student["assignment_id"]),
+                "student_id": str(student["student_id"]),
+                "responses": json.dumps(answers),
+                "idempotency_key": uuid.uuid4().hex,
+            },
+        )
+
+    targets = [s for s in ctx["students"] if s["question_ids"]][:ctx["args"].submissions]
+    await run_concurrently([job(s) for s in targets], ctx["args"].concurrency)
+
+
+async def bulk_grading(ctx):
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        assignment_ids = gradable_assignments(db, ctx["args"].grading_assignments)
+    if not assignment_ids:
+        print("bulk_grading: no ungraded descriptive responses left; reseed to rerun it")
+
+    def job(assignment_id):
+        return lambda: ctx["recorder"].call(
+            ctx["client"], "bulk_grading", "POST /teachers/assignments/{assignment_id}/evaluate", "POST",
+            f"/teachers/assignments/{assignment_id}/evaluate",
+        )
+
+    await run_concurrently([job(a) for a in assignment_ids], ctx["args"].grading_concurrency)
+
+
+async def chat(ctx):
+    rng = ctx["rng"]
+
+    def job(student):
+        topic = rng.choice(TOPICS)
+        return lambda: ctx["recorder"].call(
+            ctx["client"], "chat", "POST /chat/send", "POST", "/chat/send",
+            json={
+                "message": rng.choice(TEMPLATES).format(t=topic),
+                "session_id": f"bench-{uuid.uuid4().hex}",
+                "role": "student",
+                "grade": "7",
+            },
+        )
+
+    await run_concurrently([job(s) for s in ctx["students"][:ctx["args"].chats]], ctx["args"].concurrency)
+
+
+SCENARIOS = {
+    "login_rush": login_rush,
+    "assignment_fetch": assignment_fetch,
+    "submission_burst": submission_burst,
+    "bulk_grading": bulk_grading,
+    "chat": chat,
+}
+
+
+async def run(args, app=None) -> dict:
+    from database import SessionLocal
+    from benchmarks.seed_dataset import BENCH_PASSWORD
+
+    rng = random.Random(args.seed)
+    needed = max(args.logins, args.fetches, args.submissions, args.chats)
+    with SessionLocal() as db:
+        students = load_sample(db, needed, rng)
+
+    if app is not None:
+        # app errors come back as 500s and count as failed requests
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout)
+    else:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+
+    recorder = Recorder()
+    ctx = {"client": client, "recorder": recorder, "students": students, "args": args, "rng": rng, "password": BENCH_PASSWORD}
+    scenarios = {}
+    async with client:
+        for name in args.scenarios:
+            before = sum(len(v) for v in recorder.latencies.values())
+            started = time.perf_counter()
+            await SCENARIOS[name](ctx)
+            elapsed = time.perf_counter() - started
+            requests = sum(len(v) for v in recorder.latencies.values()) - before
+            scenarios[name] = {
+                "requests": requests,
+                "elapsed_s": round(elapsed, 3),
+                "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+            }
+            print(f"{name:<17} {requests:>6} requests in {elapsed:6.1f} s")
+    return {"scenarios": scenarios, "routes": {route: recorder.route_report(route) for route in recorder.latencies}}
+
+
+def print_report(report: dict, baseline: dict = None):
+    old_routes = (baseline or {}).get("routes", {})
+    print(f"\n{'route':<52} {'req':>6} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          + (f" {'p95 vs base':>12} {'rps vs base':>12}" if baseline else ""))
+    for route, stats in report["routes"].items():
+        line = (f"{route:<52} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_rps']:>8.1f} "
+                f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+        old = old_routes.get(route)
+        if baseline:
+            if old and old["p95_ms"] and old["throughput_rps"]:
+                line += (f" {(stats['p95_ms'] / old['p95_ms'] - 1):>+12.0%}"
+                         f" {(stats['throughput_rps'] / old['throughput_rps'] - 1):>+12.0%}")
+            else:
+                line += f" {'new':>12} {'':>12}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///bench.db")
+    parser.add_argument("--base-url", default=None, help="hit a running server instead of the in-process app "
+                        "(its own DATABASE_URL and LLM settings apply)")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--fetches", type=int, default=500, help="student app opens (3 requests each)")
+    parser.add_argument("--submissions", type=int, default=500)
+    parser.add_argument("--chats", type=int, default=300)
+    parser.add_argument("--grading-assignments", type=int, default=20)
+    parser.add_argument("--grading-concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="seconds per fake model call")
+    parser.add_argument("--llm-jitter", type=float, default=0.4)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of model calls answered with a 429")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="load_test_report.json")
+    parser.add_argument("--compare", default=None, help="earlier report to diff against")
+    args = parser.parse_args()
+
+    # the app reads these at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    from sqlalchemy.engine import make_url
+    from services.ai_service import FakeBackend, set_llm_backend
+
+    app = None
+    if args.base_url is None:
+        from main import app
+        set_llm_backend(FakeBackend(latency=args.llm_latency, jitter=args.llm_jitter, error_rate=args.llm_error_rate))
+
+    started_at = datetime.now().isoformat(timespec="seconds")
+    report = asyncio.run(run(args, app))
+    report["meta"] = {
+        "started_at": started_at,
+        "database_url": make_url(args.database_url).render_as_string(hide_password=True),
+        "target": args.base_url or "in-process",
+        "llm": {"latency": args.llm_latency, "jitter": args.llm_jitter, "error_rate": args.llm_error_rate}
+        if args.base_url is None else "server settings",
+        "concurrency": args.concurrency,
+        "grading_concurrency": args.grading_concurrency,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nreport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Login-rush benchmark for the bcrypt hashing pool.
+
+Fires N concurrent password verifications at HashingPool for several pool
+sizes and reports throughput, latency percentiles and 503 rejections, so
+PASSWORD_HASH_WORKERS / PASSWORD_HASH_MAX_PENDING can be sized per core:
+
+    python -m benchmarks.login_throughput --rounds 12 --requests 200 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from passlib.context import CryptContext
+from services.passwords import HashingOverloaded, HashingPool
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_rush(pool: HashingPool, context: CryptContext, stored_hash: str, requests: int):
+    latencies = []
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        started = time.perf_counter()
+        try:
+            await pool.run(context.verify, "correct horse", stored_hash)
+        except HashingOverloaded:
+            rejected += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(requests)))
+    return time.perf_counter() - started, latencies, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 2, 2 * (os.cpu_count() or 2)])
+    parser.add_argument("--max-pending", type=int, default=None, help="default: unbounded (no rejections)")
+    args = parser.parse_args()
+
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.rounds)
+    stored_hash = context.hash("correct horse")
+    print(f"cpus={os.cpu_count()} rounds={args.rounds} requests={args.requests}")
+    print(f"{'workers':>8} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'503s':>6}")
+    for workers in args.workers:
+        pool = HashingPool(workers=workers, max_pending=args.max_pending or args.requests)
+        elapsed, latencies, rejected = asyncio.run(run_rush(pool, context, stored_hash, args.requests))
+        print(
+            f"{workers:>8} {len(latencies) / elapsed:>9.1f} "
+            f"{statistics.median(latencies) * 1000 if latencies else 0:>8.0f} "
+            f"{percentile(latencies, 95) * 1000:>8.0f} {percentile(latencies, 99) * 1000:>8.0f} {rejected:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Seeds a database with a school-scale synthetic dataset for load tests.
+
+Defaults match a large school: 10k students in 500 classes, 50k assignments
+and about 1M student responses. Every user's password is "benchmark" (hashed
+once at the configured BCRYPT_ROUNDS). Students answer the oldest assignments
+of their class; MCQ answers are graded, descriptive ones are left for the
+grading scenarios:
+
+    python -m benchmarks.seed_dataset --database-url sqlite:///bench.db
+    python -m benchmarks.seed_dataset --database-url mysql+pymysql://root:pw@localhost/bench --students 2000
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select, text
+import migrations
+import models
+from database import build_engine
+from services.passwords import pwd_context
+
+BENCH_PASSWORD = "benchmark"
+BENCH_EMAIL_DOMAIN = "bench.local"
+SUBJECTS = ["science", "maths", "english", "history", "geography"]
+TOPICS = ["photosynthesis", "fractions", "the water cycle", "volcanoes", "magnetism", "gravity", "digestion", "poetry"]
+CHUNK = 20_000
+
+
+def chunked(rows, size: int = CHUNK):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_insert(conn, table, rows) -> int:
+    count = 0
+    for batch in chunked(rows):
+        conn.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+
+def seed(engine, students: int, classes: int, teachers: int, assignments: int, questions_per_assignment: int,
+         responses: int, descriptive_share: float, seed_value: int = 7) -> dict:
+    rng = random.Random(seed_value)
+    hashed = pwd_context.hash(BENCH_PASSWORD)
+    now = datetime.now()
+    counts = {}
+
+    with engine.begin() as conn:
+        if conn.scalar(select(func.count()).select_from(models.User)):
+            raise SystemExit("database already has users; seed an empty database")
+        if engine.dialect.name == "sqlite":
+            # bulk load only; the app opens its own connections with the defaults
+            conn.execute(text("PRAGMA synchronous=OFF"))
+
+        # ids are assigned explicitly so the rows below can reference each other
+        counts["classes"] = bulk_insert(conn, models.Class, (
+            {"id": c, "grade": str(6 + (c - 1) % 7), "section": chr(ord("A") + (c - 1) // 7 % 26),
+             "strength": students // classes + (c <= students % classes)}
+            for c in range(1, classes + 1)
+        ))
+        teacher_users = range(1, teachers + 1)
+        counts["users"] = bulk_insert(conn, models.User, (
+            {"id": u, "username": f"teacher{u}", "email": f"teacher{u}@{BENCH_EMAIL_DOMAIN}",
+             "hashed_password": hashed, "role": "teacher"}
+            for u in teacher_users
+        ))
+        conn.execute(insert(models.Teacher), [
+            {"id": t, "user_id": t, "subject": SUBJECTS[(t - 1) % len(SUBJECTS)][:10], "department": "general"}
+            for t in teacher_users
+        ])
+        # student users come after the teachers
+        counts["users"] += bulk_insert(conn, models.User, (
+            {"id": teachers + s, "username": f"student{s}", "email": f"student{s}@{BENCH_EMAIL_DOMAIN}",
+             "hashed_password": hashed, "role": "student"}
+            for s in range(1, students + 1)
+        ))
+        # student s sits in class ((s - 1) % classes) + 1, so classes fill evenly
+        counts["students"] = bulk_insert(conn, models.Student, (
+            {"id": s, "user_id": teachers + s, "class_id": (s - 1) % classes + 1}
+            for s in range(1, students + 1)
+        ))
+
+        assignment_types = {}
+
+        def assignment_rows():
+            for a in range(1, assignments + 1):
+                class_id = (a - 1) % classes + 1
+                kind = models.AssignmentType.description if rng.random() < descriptive_share else models.AssignmentType.mcq
+                assignment_types[a] = kind
+                yield {
+                    "id": a,
+                    "title": f"{rng.choice(TOPICS).title()} practice {a}",
+                    "subject": SUBJECTS[a % len(SUBJECTS)],
+                    "teacher_id": (a - 1) % teachers + 1,
+                    "class_id": class_id,
+                    # older ids are due first, so students have answered the earliest ones
+                    "due_date": now + timedelta(days=(a - 1) // classes - 20),
+                    "assignment_type": kind,
+                    "created_at": now - timedelta(days=60),
+                }
+
+        counts["assignments"] = bulk_insert(conn, models.Assignment, assignment_rows())
+
+        def question_id(assignment_id: int, position: int) -> int:
+            return (assignment_id - 1) * questions_per_assignment + position + 1
+
+        def question_rows():
+            for a in range(1, assignments + 1):
+                mcq = assignment_types[a] is models.AssignmentType.mcq
+                for q in range(questions_per_assignment):
+                    topic = rng.choice(TOPICS)
+                    yield {
+                        "id": question_id(a, q),
+                        "assignment_id": a,
+                        "question_text": f"Question {q + 1} about {topic}: explain the key idea in your own words.",
+                        "options": ["Option A", "Option B", "Option C", "Option D"] if mcq else None,
+                        "correct_answer": "Option B" if mcq else None,
+                        "marks": 1 if mcq else 5,
+                    }
+
+        counts["questions"] = bulk_insert(conn, models.AssignmentQuestion, question_rows())
+
+        per_student = math.ceil(responses / max(1, students) / questions_per_assignment)
+        per_class = assignments // classes
+
+        def response_rows():
+            written = 0
+            for s in range(1, students + 1):
+                class_id = (s - 1) % classes + 1
+                # the class's assignments are class_id, class_id + classes, ...
+                for k in range(min(per_student, per_class)):
+                    a = class_id + k * classes
+                    mcq = assignment_types[a] is models.AssignmentType.mcq
+                    for q in range(questions_per_assignment):
+                        if written >= responses:
+                            return
+                        answer = rng.choice(["Option A", "Option B", "Option C", "Option D"]) if mcq else \
+                            f"I think it is about {rng.choice(TOPICS)} because of what we learned in class."
+                        yield {
+                            "assignment_id": a,
+                            "question_id": question_id(a, q),
+                            "student_id": s,
+                            "response": answer,
+                            "obtained_marks": (1 if answer == "Option B" else 0) if mcq else None,
+                            "reviewed_by_ai": mcq,
+                            "submitted_at": now - timedelta(days=rng.randint(1, 30)),
+                        }
+                        written += 1
+
+        counts["responses"] = bulk_insert(conn, models.StudentResponse, response_rows())
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///bench.db")
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--classes", type=int, default=500)
+    parser.add_argument("--teachers", type=int, default=400)
+    parser.add_argument("--assignments", type=int, default=50_000)
+    parser.add_argument("--questions-per-assignment", type=int, default=4)
+    parser.add_argument("--responses", type=int, default=1_000_000)
+    parser.add_argument("--descriptive-share", type=float, default=0.4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    engine = build_engine(args.database_url)
+    migrations.upgrade(engine, models.Base.metadata)
+    started = time.perf_counter()
+    counts = seed(engine, args.students, args.classes, args.teachers, args.assignments,
+                  args.questions_per_assignment, args.responses, args.descriptive_share, args.seed)
+    print(f"seeded {args.database_url} in {time.perf_counter() - started:.1f} s")
+    for table, count in counts.items():
+        print(f"  {table:<12} {count:>10,}")
+
+
+if __name__ == "__main__":
+    main()
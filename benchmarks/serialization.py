@@ -0,0 +1,100 @@
+"""Per-row cost of the list-endpoint read path, before and after the lean path.
+
+Loads N assignment questions from an in-memory SQLite database and times:
+
+  before  ORM entities -> response_model validation (from_attributes)
+          -> jsonable_encoder -> json.dumps, as FastAPI does by default
+  after   column-only select -> row dicts -> TypeAdapter validate + dump_json
+  after*  column-only select -> row dicts -> FastJSONResponse (orjson when installed)
+
+    python -m benchmarks.serialization --rows 10000
+"""
+import argparse
+import json
+import time
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+import models
+from routers.students import AssignmentQuestionSchema, _questions_adapter
+from utils.responses import dumps, orjson, row_dicts
+
+COLUMNS = (
+    models.AssignmentQuestion.id,
+    models.AssignmentQuestion.assignment_id,
+    models.AssignmentQuestion.question_text,
+    models.AssignmentQuestion.options,
+    models.AssignmentQuestion.correct_answer,
+    models.AssignmentQuestion.marks,
+)
+
+
+def seed(rows: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.execute(insert(models.AssignmentQuestion), [
+            {
+                "assignment_id": 1,
+                "question_text": f"Which of these best describes step {i} of photosynthesis in green plants?",
+                "options": ["Light absorption", "Water splitting", "Carbon fixation", "Glucose release"],
+                "correct_answer": "Carbon fixation",
+                "marks": 2,
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+    return engine
+
+
+def before(engine) -> bytes:
+    with Session(engine) as db:
+        questions = db.query(models.AssignmentQuestion).filter(models.AssignmentQuestion.assignment_id == 1).all()
+        validated = [AssignmentQuestionSchema.model_validate(q) for q in questions]
+        return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def after_adapter(engine) -> bytes:
+    with Session(engine) as db:
+        questions = row_dicts(db.execute(select(*COLUMNS).where(models.AssignmentQuestion.assignment_id == 1)))
+        return _questions_adapter.dump_json(_questions_adapter.validate_python(questions))
+
+
+def after_fast_json(engine) -> bytes:
+    with Session(engine) as db:
+        return dumps(row_dicts(db.execute(select(*COLUMNS).where(models.AssignmentQuestion.assignment_id == 1))))
+
+
+def timed(fn, engine, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(engine)
+        best = min(best, time.perf_counter() - started)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = seed(args.rows)
+    print(f"rows={args.rows} encoder={'orjson' if orjson else 'json'}")
+    print(f"{'path':<34} {'total ms':>9} {'us/row':>8} {'speedup':>8}")
+    baseline = None
+    for name, fn in (
+        ("before: ORM + response_model", before),
+        ("after: columns + TypeAdapter", after_adapter),
+        ("after: columns + FastJSONResponse", after_fast_json),
+    ):
+        elapsed, body = timed(fn, engine, args.repeat)
+        assert json.loads(body)[0]["question_text"].startswith("Which")
+        baseline = baseline or elapsed
+        print(f"{name:<34} {elapsed * 1000:>9.1f} {elapsed / args.rows * 1e6:>8.2f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
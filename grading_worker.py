@@ -0,0 +1,26 @@
+import argparse
+import asyncio
+import signal
+import models
+import migrations
+from database import engine
+from services.grading_queue import GRADING_WORKERS, run_workers
+
+
+async def serve(workers: int):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # finish the jobs in hand, then exit; anything unfinished is re-claimed after the lease
+        loop.add_signal_handler(sig, stop.set)
+    print(f"Grading worker started with {workers} slots")
+    await run_workers(workers, stop)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background AI grading jobs")
+    parser.add_argument("--workers", type=int, default=GRADING_WORKERS, help="jobs processed concurrently")
+    args = parser.parse_args()
+
+    migrations.upgrade(engine, models.Base.metadata)
+    asyncio.run(serve(args.workers))
@@ -2,11 +2,14 @@ from http.client import HTTPException
 from fastapi import FastAPI 
 from fastapi.middleware.cors import CORSMiddleware
 import models
+import migrations
 from database import engine
-from routers import login, students, teachers, admin, chat 
+from routers import login, students, teachers, admin, chat, analytics, metrics
+from services.metrics import METRICS_ENABLED, MetricsMiddleware, instrument_sqlalchemy
 
 app = FastAPI()
-models.Base.metadata.create_all(bind=engine)
+# creates missing tables and applies pending migrations, one process at a time
+migrations.upgrade(engine, models.Base.metadata)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,12 +18,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+if METRICS_ENABLED:
+    instrument_sqlalchemy()
+    # added last so it wraps everything else, CORS included
+    app.add_middleware(MetricsMiddleware)
  
 app.include_router(login.router, prefix="/auth", tags=["Authentication"])
 app.include_router(students.router, prefix="/students", tags=["Students"])
 app.include_router(teachers.router, prefix="/teachers", tags=["Teachers"])
 app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 app.include_router(chat.router, prefix='/chat',tags=['Chat'])
+app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 
 @app.get("/")
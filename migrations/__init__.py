@@ -0,0 +1,88 @@
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, inspect, select, text
+from migrations import v0001_hot_path_indexes, v0002_student_response_unique
+
+# Applied in order; each module exposes VERSION, NAME and upgrade(connection).
+# Upgrades must be idempotent: a fresh database already has everything
+# create_all() builds from models.py, and the runner then only stamps it.
+MIGRATIONS = [
+    v0001_hot_path_indexes,
+    v0002_student_response_unique,
+]
+
+# every app worker and pod upgrades at startup; they take turns on this lock
+MIGRATION_LOCK_NAME = 'schema_migrations'
+MIGRATION_LOCK_TIMEOUT = int(os.getenv('MIGRATION_LOCK_TIMEOUT', '600'))
+_PG_LOCK_KEY = 7_301_965_313  # any fixed bigint; pg advisory locks are keyed by number
+
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations',
+    _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def applied_versions(engine) -> set:
+    if not inspect(engine).has_table('schema_migrations'):
+        return set()
+    with engine.connect() as conn:
+        return set(conn.scalars(select(schema_migrations.c.version)))
+
+
+@contextmanager
+def migration_lock(conn):
+    dialect = conn.dialect.name
+    if dialect == 'mysql':
+        if conn.scalar(text("SELECT GET_LOCK(:name, :timeout)"), {'name': MIGRATION_LOCK_NAME, 'timeout': MIGRATION_LOCK_TIMEOUT}) != 1:
+            raise RuntimeError("Timed out waiting for the migration lock")
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': MIGRATION_LOCK_NAME})
+    elif dialect == 'postgresql':
+        conn.execute(text(f"SET lock_timeout = '{MIGRATION_LOCK_TIMEOUT}s'"))
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {'key': _PG_LOCK_KEY})
+        conn.execute(text("RESET lock_timeout"))
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': _PG_LOCK_KEY})
+    elif dialect == 'sqlite':
+        # no named locks: the whole upgrade is one exclusive transaction (SQLite DDL is transactional)
+        conn.exec_driver_sql("BEGIN EXCLUSIVE")
+        yield
+    else:
+        yield
+
+
+def upgrade(engine, metadata=None) -> list:
+    """Create missing tables from metadata (e.g. models.Base.metadata), then apply pending migrations."""
+    applied = []
+    with engine.connect() as conn, migration_lock(conn):
+        # MySQL and PostgreSQL locks are per session, so each migration commits on its own
+        commit_each = conn.dialect.name != 'sqlite'
+        if metadata is not None:
+            metadata.create_all(bind=conn)
+        _metadata.create_all(bind=conn)
+        if commit_each:
+            conn.commit()
+        # read under the lock: another process may have just finished upgrading
+        done = set(conn.scalars(select(schema_migrations.c.version)))
+        for migration in MIGRATIONS:
+            if migration.VERSION in done:
+                continue
+            migration.upgrade(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=migration.VERSION, name=migration.NAME, applied_at=datetime.now()
+            ))
+            if commit_each:
+                conn.commit()
+            print(f"Applied migration {migration.VERSION:04d} {migration.NAME}")
+            applied.append(migration.VERSION)
+        conn.commit()
+    return applied
@@ -0,0 +1,10 @@
+import models
+from database import engine
+from migrations import MIGRATIONS, applied_versions, upgrade
+
+if __name__ == "__main__":
+    upgrade(engine, models.Base.metadata)
+    done = applied_versions(engine)
+    for migration in MIGRATIONS:
+        state = "applied" if migration.VERSION in done else "pending"
+        print(f"{migration.VERSION:04d} {migration.NAME}: {state}")
@@ -0,0 +1,83 @@
+"""EXPLAIN every hot router query and fail on full table scans.
+
+Run against a migrated database, ideally one with realistic data:
+
+    python -m migrations && python -m migrations.query_plans
+"""
+import re
+import sys
+from datetime import datetime
+from database import engine
+from routers.admin import all_classes_query, unassigned_users_query
+from routers.login import login_user_query, student_meta_query, teacher_meta_query
+from routers.students import (
+    assignment_questions_query, dashboard_query, receipt_query, student_assignments_query, student_by_user_query,
+)
+from routers.teachers import _submissions_query, class_by_section_query, grade_classes_query, teacher_assignments_query
+from services.auth import role_claims_query
+from services.grading import submission_grading_query, ungraded_descriptive_query
+from services.grading_queue import due_job_query
+from services.question_bank import bank_search_query, minhash, near_duplicate_query
+
+# (name, statement, tables allowed to be read in full); every statement comes
+# from the builder the route itself calls, so this checks the SQL that ships
+QUERIES = [
+    ("login.login_user", login_user_query("a@example.com"), ()),
+    ("login.get_student_meta", student_meta_query(1), ()),
+    ("login.get_teacher_meta", teacher_meta_query(1), ()),
+    ("auth.load_role_claims", role_claims_query(1), ()),
+    ("students.resolve_student", student_by_user_query(1), ()),
+    ("students.get_student_assignments", student_assignments_query(1), ()),
+    ("students.get_assignment_questions", assignment_questions_query(1), ()),
+    ("students.get_student_dashboard", dashboard_query(1, 1), ()),
+    ("students.submit_student_responses", receipt_query(1, 1, "key"), ()),
+    ("students.submit_student_responses[any assignment]", receipt_query(1, None, "key"), ()),
+    ("teachers.get_class_id", class_by_section_query("7", "A"), ()),
+    ("teachers.send_assignment_bulk", grade_classes_query("7"), ()),
+    ("teachers.get_assignments_by_teacher", teacher_assignments_query(1), ()),
+    ("teachers.get_submissions_by_assignment", _submissions_query(1), ()),
+    ("teachers.get_submissions_by_assignment[filters]",
+     _submissions_query(1, ungraded=True, question_id=1, student_id=1), ()),
+    ("teachers.evaluate_submission", submission_grading_query(1), ()),
+    ("grading.ungraded_descriptive_query", ungraded_descriptive_query(1), ()),
+    ("grading_queue.claim_job", due_job_query(datetime(2030, 1, 1)), ()),
+    # the term matches are found by index, then the (small) aggregated set is walked
+    ("question_bank.take_from_bank", bank_search_query("mcq", "photosynthesis light", "7", 10), ("anon_1",)),
+    ("question_bank.find_near_duplicate",
+     near_duplicate_query("mcq", "7", minhash("What gas do plants take in during photosynthesis?")), ()),
+    ("admin.get_all_classes", all_classes_query(), ("classes",)),
+    # walks users in id order; the role tables are only probed by index
+    ("admin.get_unassigned_users", unassigned_users_query(), ("users",)),
+    ("admin.get_unassigned_users[role]", unassigned_users_query(role="student", after_id=100), ("users",)),
+]
+
+_SQLITE_SCAN_RE = re.compile(r"^SCAN (\w+)")
+
+
+def full_scans(conn, stmt) -> list:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        scans = []
+        for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql):
+            match = _SQLITE_SCAN_RE.match(row[3])
+            if match and match.group(1) != "CONSTANT":
+                scans.append(match.group(1))
+        return scans
+    return [row["table"] for row in conn.exec_driver_sql("EXPLAIN " + sql).mappings() if row["type"] == "ALL"]
+
+
+def check(bind=engine) -> list:
+    failures = []
+    with bind.connect() as conn:
+        for name, stmt, allowed in QUERIES:
+            scans = [table for table in full_scans(conn, stmt) if table not in allowed]
+            if scans:
+                failures.append((name, scans))
+                print(f"FAIL {name}: full scan on {', '.join(scans)}")
+            else:
+                print(f"ok   {name}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if check() else 0)
@@ -0,0 +1,28 @@
+from sqlalchemy import Index, MetaData, Table, inspect
+
+VERSION = 1
+NAME = 'hot_path_indexes'
+
+# (table, index name, columns) for the filters the routers actually run
+INDEXES = [
+    ('student_responses', 'ix_student_responses_assignment_student', ('assignment_id', 'student_id')),
+    ('student_responses', 'ix_student_responses_question_id', ('question_id',)),
+    ('assignments', 'ix_assignments_class_id_due_date', ('class_id', 'due_date')),
+    ('assignments', 'ix_assignments_teacher_id', ('teacher_id',)),
+    ('assignment_questions', 'ix_assignment_questions_assignment_id', ('assignment_id',)),
+    ('students', 'ix_students_user_id', ('user_id',)),
+    ('teachers', 'ix_teachers_user_id', ('user_id',)),
+    ('parents', 'ix_parents_user_id', ('user_id',)),
+    ('classes', 'ix_classes_grade_section', ('grade', 'section')),
+]
+
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    metadata = MetaData()
+    for table_name, index_name, columns in INDEXES:
+        existing = {index['name'] for index in inspector.get_indexes(table_name)}
+        if index_name in existing:
+            continue
+        table = Table(table_name, metadata, autoload_with=conn)
+        Index(index_name, *(table.c[column] for column in columns)).create(conn)
@@ -0,0 +1,35 @@
+from sqlalchemy import Index, MetaData, Table, inspect, text
+
+VERSION = 2
+NAME = 'student_response_unique'
+
+CONSTRAINT_NAME = 'uq_student_responses_student_question'
+COLUMNS = ['student_id', 'question_id']
+
+
+def _has_unique_key(inspector) -> bool:
+    for constraint in inspector.get_unique_constraints('student_responses'):
+        if constraint['column_names'] == COLUMNS:
+            return True
+    for index in inspector.get_indexes('student_responses'):
+        if index.get('unique') and index['column_names'] == COLUMNS:
+            return True
+    return False
+
+
+def upgrade(conn):
+    if _has_unique_key(inspect(conn)):
+        return
+    # Keep the latest answer for each (student, question) pair. The derived
+    # table lets MySQL read from the table it is deleting from.
+    conn.execute(text(
+        "DELETE FROM student_responses WHERE id NOT IN ("
+        " SELECT keep_id FROM ("
+        "  SELECT MAX(id) AS keep_id FROM student_responses GROUP BY student_id, question_id"
+        " ) AS latest"
+        ")"
+    ))
+    # A unique index works on every backend (SQLite cannot ALTER TABLE ADD
+    # CONSTRAINT) and is what ON CONFLICT / ON DUPLICATE KEY match against.
+    table = Table('student_responses', MetaData(), autoload_with=conn)
+    Index(CONSTRAINT_NAME, *(table.c[column] for column in COLUMNS), unique=True).create(conn)
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean, JSON, UniqueConstraint, Index, Float
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -33,6 +33,9 @@ class User(Base):
 
 class Student(Base):
     __tablename__ = 'students'
+    __table_args__ = (
+        Index('ix_students_user_id', 'user_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -43,6 +46,9 @@ class Student(Base):
 
 class Teacher(Base):
     __tablename__ = 'teachers'
+    __table_args__ = (
+        Index('ix_teachers_user_id', 'user_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -53,6 +59,9 @@ class Teacher(Base):
 
 class Parent(Base):
     __tablename__ = 'parents'
+    __table_args__ = (
+        Index('ix_parents_user_id', 'user_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -70,6 +79,9 @@ class Admin(Base):
 
 class Class(Base):
     __tablename__ = 'classes'
+    __table_args__ = (
+        Index('ix_classes_grade_section', 'grade', 'section'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     grade = Column(String(10), nullable=False)
@@ -86,6 +98,10 @@ class AssignmentType(enum.Enum):
 
 class Assignment(Base):
     __tablename__ = 'assignments'
+    __table_args__ = (
+        Index('ix_assignments_class_id_due_date', 'class_id', 'due_date'),
+        Index('ix_assignments_teacher_id', 'teacher_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -101,6 +117,9 @@ class Assignment(Base):
 
 class AssignmentQuestion(Base):
     __tablename__ = 'assignment_questions'
+    __table_args__ = (
+        Index('ix_assignment_questions_assignment_id', 'assignment_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     assignment_id = Column(Integer, ForeignKey('assignments.id'), nullable=False)
@@ -113,6 +132,12 @@ class AssignmentQuestion(Base):
     
 class StudentResponse(Base):
     __tablename__ = 'student_responses'
+    __table_args__ = (
+        # one answer per student per question; re-submissions update it in place
+        UniqueConstraint('student_id', 'question_id', name='uq_student_responses_student_question'),
+        Index('ix_student_responses_assignment_student', 'assignment_id', 'student_id'),
+        Index('ix_student_responses_question_id', 'question_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     assignment_id = Column(Integer, ForeignKey('assignments.id'), nullable=False)
@@ -123,3 +148,109 @@ class StudentResponse(Base):
     obtained_marks = Column(Integer, nullable=True)
     reviewed_by_ai = Column(Boolean, default=False)
     submitted_at = Column(DateTime, default=datetime.now)
+
+class SubmissionReceipt(Base):
+    __tablename__ = 'submission_receipts'
+    __table_args__ = (
+        # keys are chosen by clients, so they only need to be unique per student
+        UniqueConstraint('student_id', 'idempotency_key', name='uq_submission_receipts_student_key'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String(100), nullable=False)
+    student_id = Column(Integer, ForeignKey('students.id'), nullable=False)
+    assignment_id = Column(Integer, ForeignKey('assignments.id'), nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+# Materialized grading summaries, maintained by services/analytics.py
+class AssignmentStats(Base):
+    __tablename__ = 'assignment_stats'
+
+    assignment_id = Column(Integer, ForeignKey('assignments.id'), primary_key=True)
+    class_id = Column(Integer, ForeignKey('classes.id'), nullable=False, index=True)
+    students_scored = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0)
+    score_sq_sum = Column(Float, nullable=False, default=0)
+    histogram = Column(JSON, nullable=True)  # {"<total score>": number of students}
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class QuestionStats(Base):
+    __tablename__ = 'question_stats'
+
+    question_id = Column(Integer, ForeignKey('assignment_questions.id'), primary_key=True)
+    assignment_id = Column(Integer, ForeignKey('assignments.id'), nullable=False, index=True)
+    max_marks = Column(Integer, nullable=False)
+    responses_scored = Column(Integer, nullable=False, default=0)
+    # running sums over scored responses: q = question score, t = that student's assignment total
+    score_sum = Column(Float, nullable=False, default=0)
+    score_sq_sum = Column(Float, nullable=False, default=0)
+    total_sum = Column(Float, nullable=False, default=0)
+    total_sq_sum = Column(Float, nullable=False, default=0)
+    cross_sum = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class GradingJobStatus(enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    dead = "dead"  # gave up after max_attempts; see last_error
+
+class GradingJob(Base):
+    __tablename__ = 'grading_jobs'
+    __table_args__ = (
+        # workers claim the oldest due job: WHERE status = 'queued' AND run_after <= now
+        Index('ix_grading_jobs_status_run_after', 'status', 'run_after'),
+        Index('ix_grading_jobs_kind_target', 'kind', 'target_id'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(20), nullable=False)  # 'submission' or 'assignment'
+    target_id = Column(Integer, nullable=False)
+    status = Column(Enum(GradingJobStatus), nullable=False, default=GradingJobStatus.queued)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime, nullable=False, default=datetime.now)
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime, nullable=True)  # lease heartbeat while running
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=True)
+    result = Column(JSON, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+
+# Question bank: published questions indexed for reuse by generate-questions
+class BankQuestion(Base):
+    __tablename__ = 'bank_questions'
+    __table_args__ = (
+        Index('ix_bank_questions_type_grade', 'question_type', 'grade'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_type = Column(String(20), nullable=False)  # 'mcq', 'description' or 'prob'
+    subject = Column(String(100), nullable=True)
+    topic = Column(String(255), nullable=False)
+    grade = Column(String(20), nullable=False)
+    question_text = Column(Text, nullable=False)
+    options = Column(JSON, nullable=True)
+    correct_answer = Column(String(255), nullable=True)
+    marks = Column(Integer, nullable=False)
+    text_hash = Column(String(64), unique=True, nullable=False)  # exact duplicates
+    minhash = Column(JSON, nullable=False)  # signature for near-duplicate checks
+    times_served = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+
+class BankQuestionTerm(Base):
+    # inverted index over topic and question words
+    __tablename__ = 'bank_question_terms'
+
+    term = Column(String(50), primary_key=True)
+    question_id = Column(Integer, ForeignKey('bank_questions.id'), primary_key=True)
+    weight = Column(Integer, nullable=False, default=1)
+
+class BankQuestionBand(Base):
+    # MinHash LSH buckets: questions sharing a band are near-duplicate candidates
+    __tablename__ = 'bank_question_bands'
+
+    band = Column(String(24), primary_key=True)
+    question_id = Column(Integer, ForeignKey('bank_questions.id'), primary_key=True)
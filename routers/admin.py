@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import exists, func, select
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_read_db
+from services.auth import identity_cache
+from services.roster_import import import_roster
+from utils.responses import FastJSONResponse, row_dicts
 import models
 from typing import List, Optional
 
@@ -16,32 +20,61 @@ class AssignRoleRequest(BaseModel):
     subject: Optional[str] = None
     
 class ClassOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     grade: str
     section: str
-
-    class Config:
-        orm_mode = True
    
 
 
-@router.get("/unassigned-users")
-def get_unassigned_users(db: Session = Depends(get_db)):
-    student_ids = [s.user_id for s in db.query(models.Student).all()]
-    teacher_ids = [t.user_id for t in db.query(models.Teacher).all()]
-    parent_ids = [p.user_id for p in db.query(models.Parent).all()]
-    assigned_ids = set(student_ids + teacher_ids + parent_ids)
-    unassigned_users = db.query(models.User).filter(~models.User.id.in_(assigned_ids)).all()
-
-    return [
-        {
-            "id": user.id,
-            "name": user.username,
-            "email": user.email,
-            "role": user.role
-        }
-        for user in unassigned_users
+def _unassigned_conditions(role: Optional[str] = None):
+    # Anti-joins evaluated by the database; each probe hits a user_id index.
+    conditions = [
+        ~exists().where(models.Student.user_id == models.User.id),
+        ~exists().where(models.Teacher.user_id == models.User.id),
+        ~exists().where(models.Parent.user_id == models.User.id),
     ]
+    if role:
+        conditions.append(models.User.role == role)
+    return conditions
+
+
+def unassigned_users_query(role: Optional[str] = None, after_id: Optional[int] = None, limit: int = 100):
+    stmt = (
+        select(models.User.id, models.User.username, models.User.email, models.User.role)
+        .where(*_unassigned_conditions(role))
+        .order_by(models.User.id)
+        .limit(limit)
+    )
+    if after_id is not None:
+        stmt = stmt.where(models.User.id > after_id)
+    return stmt
+
+
+@router.get("/unassigned-users")
+def get_unassigned_users(
+    role: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    total = db.scalar(select(func.count()).select_from(models.User).where(*_unassigned_conditions(role)))
+    rows = db.execute(unassigned_users_query(role, after_id, limit)).all()
+
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "name": row.username,
+                "email": row.email,
+                "role": row.role
+            }
+            for row in rows
+        ],
+        "total": total,
+        "next_cursor": rows[-1].id if len(rows) == limit else None
+    }
 
 from fastapi import Request
 
@@ -89,9 +122,20 @@ async def assign_role(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Invalid role")
 
     db.commit()
+    identity_cache.invalidate(user_id)
     return {"message": f"{role.capitalize()} assigned successfully"}
 
+def all_classes_query():
+    return select(models.Class.id, models.Class.grade, models.Class.section)
+
+
 @router.get("/classes")
-def get_all_classes(db: Session = Depends(get_db)):
-    classes = db.query(models.Class).all()
-    return [{"id": c.id, "grade": c.grade, "section": c.section} for c in classes]
+def get_all_classes(db: Session = Depends(get_read_db)):
+    result = db.execute(all_classes_query())
+    return FastJSONResponse(row_dicts(result))
+
+@router.post("/roster/import")
+async def import_roster_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    # CSV with a header row, or JSONL; columns: name, email, role, class_id or
+    # grade + section (students), department + subject (teachers), optional password
+    return await import_roster(db, file)
@@ -0,0 +1,63 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import get_db, get_read_db
+from services.analytics import assignment_summary, question_summary, recompute_assignments
+import models
+
+router = APIRouter()
+
+
+class RecomputeRequest(BaseModel):
+    assignment_ids: Optional[List[int]] = None  # None rebuilds every assignment
+
+
+@router.get("/assignments/{assignment_id}")
+def get_assignment_stats(assignment_id: int, db: Session = Depends(get_read_db)):
+    row = db.get(models.AssignmentStats, assignment_id)
+    if row is None:
+        if db.get(models.Assignment, assignment_id) is None:
+            raise HTTPException(status_code=404, detail="Assignment not found")
+        return {"assignment_id": assignment_id, "students_scored": 0, "mean": None, "median": None,
+                "std_dev": None, "histogram": [], "updated_at": None}
+    return assignment_summary(row)
+
+
+@router.get("/assignments/{assignment_id}/questions")
+def get_question_stats(assignment_id: int, db: Session = Depends(get_read_db)):
+    rows = db.scalars(
+        select(models.QuestionStats)
+        .where(models.QuestionStats.assignment_id == assignment_id)
+        .order_by(models.QuestionStats.question_id)
+    ).all()
+    return {"assignment_id": assignment_id, "questions": [question_summary(row) for row in rows]}
+
+
+@router.get("/classes/{class_id}")
+def get_class_stats(class_id: int, db: Session = Depends(get_read_db)):
+    rows = db.execute(
+        select(models.AssignmentStats, models.Assignment.title, models.Assignment.due_date)
+        .join(models.Assignment, models.Assignment.id == models.AssignmentStats.assignment_id)
+        .where(models.AssignmentStats.class_id == class_id)
+        .order_by(models.Assignment.due_date, models.Assignment.id)
+    ).all()
+    assignments = [
+        {**assignment_summary(stats), "title": title, "due_date": due_date}
+        for stats, title, due_date in rows
+    ]
+    students_scored = sum(stats.students_scored for stats, _, _ in rows)
+    score_sum = sum(stats.score_sum for stats, _, _ in rows)
+    return {
+        "class_id": class_id,
+        "assignments": assignments,
+        "overall_mean": score_sum / students_scored if students_scored else None,
+    }
+
+
+@router.post("/recompute")
+def recompute_stats(payload: RecomputeRequest, db: Session = Depends(get_db)):
+    recomputed = recompute_assignments(db, payload.assignment_ids)
+    db.commit()
+    return {"recomputed_assignments": recomputed}
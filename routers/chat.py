@@ -1,32 +1,25 @@
+import json
+import time
+from typing import Optional
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from google.generativeai import GenerativeModel
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from services.ai_service import get_llm_client, llm_http_error, LLMError
+from services.chat_sessions import chat_sessions
+from services.metrics import chat_replies
+from services.semantic_cache import cacheable, chat_cache
 
 router = APIRouter()
 
-# Create model instance
-model = GenerativeModel("gemini-2.0-flash")
-
-# Create chat session
-chat = model.start_chat()
-
 class ChatRequest(BaseModel):
     message: str
     session_id: str
     role: str
+    grade: Optional[str] = None  # scopes cached answers so they stay age-appropriate
 
-@router.post("/send")
-def chat_endpoint(req: ChatRequest):
-    # Define role-specific system message (only added on first interaction per session)
-    if req.role.lower() == "teacher":
+def system_prompt_for(role: str) -> str:
+    # Sent once per call as the model's system instruction, not as message text
+    if role == "teacher":
         system_prompt = (
             "You are an AI assistant acting as a wise, imaginative, and structured Hogwarts professor. "
             "You are helping real-world school teachers craft lesson plans, activities, and teaching material "
@@ -49,7 +42,7 @@ def chat_endpoint(req: ChatRequest):
             "Format responses in clean markdown with clear section titles.\n"
         )
 
-    elif req.role.lower() == "student":
+    elif role == "student":
         system_prompt = (
             "You are an AI professor at Hogwarts School of Witchcraft and Wizardry. Your role is to guide and support students "
             "by answering academic doubts, explaining magical and real-world topics, and encouraging learning through magical metaphors.\n\n"
@@ -72,9 +65,94 @@ def chat_endpoint(req: ChatRequest):
             "and ensure your responses are helpful and age-appropriate."
         )
 
+    return system_prompt
+
+
+@router.post("/send")
+async def chat_endpoint(req: ChatRequest):
+    role = req.role.lower()
+    session = chat_sessions.get(req.session_id, role)
+
+    # One message at a time per session so turns are recorded in order
+    async with session.lock:
+        use_cache = cacheable(role, session)
+        if use_cache:
+            answer, _, vector = await chat_cache.lookup(role, req.grade, req.message)
+            if answer is not None:
+                session.record(req.message, answer)
+                chat_replies.inc("send", "cache")
+                return {"response": answer, "cached": True}
+
+        started = time.perf_counter()
+        try:
+            response = await get_llm_client().generate(
+                session.contents(req.message),
+                system_instruction=system_prompt_for(role),
+            )
+        except LLMError as e:
+            chat_replies.inc("send", "error")
+            raise llm_http_error(e)
+        chat_replies.inc("send", "model")
+        session.record(req.message, response.text)
+        if use_cache:
+            chat_cache.store(role, req.grade, req.message, response.text, vector, time.perf_counter() - started)
+
+    return {"response": response.text, "cached": False}
+
+
+@router.get("/cache-stats")
+def chat_cache_stats():
+    return chat_cache.stats()
+
+
+
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@router.post("/send/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    role = req.role.lower()
+    session = chat_sessions.get(req.session_id, role)
+
+    async def events():
+        # Starlette cancels this generator when the client disconnects; the
+        # client's stream() then closes the upstream call and frees its slot.
+        async with session.lock:
+            use_cache = cacheable(role, session)
+            if use_cache:
+                answer, _, vector = await chat_cache.lookup(role, req.grade, req.message)
+                if answer is not None:
+                    session.record(req.message, answer)
+                    chat_replies.inc("stream", "cache")
+                    yield _sse({"delta": answer})
+                    yield _sse({"cached": True}, event="done")
+                    return
 
-    # Send message to Gemini with prompt + user message
-    full_prompt = system_prompt + req.message
-    response = chat.send_message(full_prompt)
+            started = time.perf_counter()
+            parts = []
+            try:
+                async for chunk in get_llm_client().stream(
+                    session.contents(req.message),
+                    system_instruction=system_prompt_for(role),
+                ):
+                    parts.append(chunk)
+                    yield _sse({"delta": chunk})
+            except LLMError as e:
+                chat_replies.inc("stream", "error")
+                print(f"AI model error: {str(e)}")
+                yield _sse({"detail": f"AI model error: {str(e)}"}, event="error")
+                return
+            chat_replies.inc("stream", "model")
+            reply = "".join(parts)
+            session.record(req.message, reply)
+            if use_cache and reply:
+                chat_cache.store(role, req.grade, req.message, reply, vector, time.perf_counter() - started)
+            yield _sse({"cached": False}, event="done")
 
-    return {"response": response.text}
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,34 +1,48 @@
-from datetime import datetime, timedelta, timezone
-from urllib.request import Request
-from http.client import HTTPException
-from fastapi import Depends, Request, APIRouter
-import jwt 
+import asyncio
+from fastapi import Depends, HTTPException, Request, APIRouter
 import models
 from database import get_db
+from sqlalchemy import or_, select, update
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from services.passwords import HashingOverloaded, hash_password, verify_password
+from services.auth import Identity, create_access_token, get_current_identity, get_optional_identity, load_role_claims
 from typing import Optional
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 @router.get("/login")
 def login():
     return {"message": "Login successful! Backend response received 🎉"}
 
-SECRET_KEY = "THIS_IS_HOGWARTS_PORTAL"  # Replace with a strong secret key
-ALGORITHM = "HS256"  # You can use other algorithms, like RS256, if you want
+def login_user_query(email: str):
+    return (
+        select(models.User.id, models.User.email, models.User.username, models.User.role, models.User.hashed_password)
+        .where(models.User.email == email)
+    )
+
+
+def student_meta_query(user_id: int):
+    return select(models.Student).where(models.Student.user_id == user_id)
+
+
+def teacher_meta_query(user_id: int):
+    return select(models.Teacher).where(models.Teacher.user_id == user_id)
+
+
+def _find_login_user(db: Session, email: str):
+    user = db.execute(login_user_query(email)).first()
+    # hand the connection back to the pool before the slow bcrypt step
+    db.rollback()
+    return user
+
+
+def _complete_login(db: Session, user_id: int, new_hash: Optional[str]) -> dict:
+    if new_hash:
+        # stored hash used an old work factor; upgrade it transparently
+        db.execute(update(models.User).where(models.User.id == user_id).values(hashed_password=new_hash))
+        db.commit()
+    return load_role_claims(db, user_id)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(hours=24)  # Default 1-hour expiration
-    to_encode.update({"exp": expire})
-    
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
 
 @router.post("/login")
 async def login_user(request: Request, db: Session = Depends(get_db)):
@@ -39,25 +53,32 @@ async def login_user(request: Request, db: Session = Depends(get_db)):
     if not email or not password:
         raise HTTPException(status_code=400, detail="Email and password are required")
 
-    user = db.query(models.User).filter(models.User.email == email).first()
+    # database calls run in a worker thread so a busy pool never blocks the event loop
+    user = await asyncio.to_thread(_find_login_user, db, email)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not pwd_context.verify(password, user.hashed_password):
+    try:
+        valid, new_hash = await verify_password(password, user.hashed_password)
+    except HashingOverloaded:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+    if not valid:
         raise HTTPException(status_code=401, detail="Incorrect password")
 
-    # Create JWT token
-    access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id, "role": user.role}
-    )
+    # role IDs go in the response body only; requests resolve them through the
+    # identity cache, which this lookup also warms
+    role_claims = await asyncio.to_thread(_complete_login, db, user.id, new_hash)
+    access_token = create_access_token(data={"sub": user.email, "user_id": user.id, "role": user.role})
 
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "user_id": user.id,
         "role": user.role,
-        "username": user.username
+        "username": user.username,
+        **role_claims
     }
 
 #signup api
@@ -72,13 +93,13 @@ async def add_user(request: Request, db: Session = Depends(get_db)):
     if not username or not email or not password or not role:
         raise HTTPException(status_code=400, detail="Missing required fields")
 
-    existing_user = db.query(models.User).filter(
-        (models.User.username == username) | (models.User.email == email)
-    ).first()
-    if existing_user:
+    if await asyncio.to_thread(_user_exists, db, username, email):
         raise HTTPException(status_code=400, detail="User already exists")
 
-    hashed_password = pwd_context.hash(password)
+    try:
+        hashed_password = await hash_password(password)
+    except HashingOverloaded:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
 
     new_user = models.User(
         username=username,
@@ -86,15 +107,33 @@ async def add_user(request: Request, db: Session = Depends(get_db)):
         hashed_password=hashed_password,
         role=role
     )
-    db.add(new_user)
+    user_id = await asyncio.to_thread(_create_user, db, new_user)
+
+    return {"message": "User created successfully", "user_id": user_id}
+
+
+def _user_exists(db: Session, username: str, email: str) -> bool:
+    existing = db.execute(
+        select(models.User.id).where(or_(models.User.username == username, models.User.email == email))
+    ).first()
+    db.rollback()  # same as login: don't hold a connection across bcrypt
+    return existing is not None
+
+
+def _create_user(db: Session, user: models.User) -> int:
+    db.add(user)
     db.commit()
-    db.refresh(new_user)
+    return user.id
 
-    return {"message": "User created successfully", "user_id": new_user.id}
+@router.get("/me")
+def get_me(identity: Identity = Depends(get_current_identity)):
+    return identity
 
 @router.get("/student/meta/{user_id}")
-def get_student_meta(user_id: int, db: Session = Depends(get_db)):
-    student = db.query(models.Student).filter_by(user_id=user_id).first()
+def get_student_meta(user_id: int, identity: Optional[Identity] = Depends(get_optional_identity), db: Session = Depends(get_db)):
+    if identity and identity.user_id == user_id and identity.student_id is not None:
+        return {"student_id": identity.student_id, "class_id": identity.class_id}
+    student = db.scalars(student_meta_query(user_id)).first()
     if not student:
         raise HTTPException(status_code=404, detail="Student metadata not found")
     return {
@@ -103,8 +142,10 @@ def get_student_meta(user_id: int, db: Session = Depends(get_db)):
     }
 
 @router.get("/teacher/meta/{user_id}")
-def get_teacher_meta(user_id: int, db: Session = Depends(get_db)):
-    teacher = db.query(models.Teacher).filter_by(user_id=user_id).first()
+def get_teacher_meta(user_id: int, identity: Optional[Identity] = Depends(get_optional_identity), db: Session = Depends(get_db)):
+    if identity and identity.user_id == user_id and identity.teacher_id is not None:
+        return {"teacher_id": identity.teacher_id, "subject": identity.subject, "department": identity.department}
+    teacher = db.scalars(teacher_meta_query(user_id)).first()
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher metadata not found")
     return {
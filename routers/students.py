@@ -1,27 +1,46 @@
-import shutil
-from fastapi import FastAPI, UploadFile, File, Form, APIRouter, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import and_, func, literal, or_, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from models import AssignmentQuestion, Student, Assignment, StudentResponse
-from database import get_db
-from typing import List, Optional
+from models import AssignmentQuestion, Student, Assignment, StudentResponse, SubmissionReceipt
+from database import get_db, get_read_db
+from services.analytics import apply_student_change, student_scores
+from services.auth import Identity, get_optional_identity
+from services.upload_store import UploadBudget, UploadTooLarge, save_upload
+from utils.responses import FastJSONResponse, row_dicts
+from typing import Dict, List, Optional, Union
 import json
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter, field_validator
 from datetime import datetime
 
 router = APIRouter()
 
 
 class AssignmentQuestionSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     assignment_id: int
     question_text: str
-    options: Optional[List[str]] = None
+    options: Optional[Union[List[str], Dict[str, str]]] = None
     correct_answer: Optional[str] = None
     marks: int
 
-    class Config:
-        orm_mode = True
+    @field_validator("options", mode="before")
+    @classmethod
+    def _decode_options(cls, value):
+        # older rows stored options as a JSON string
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                return []
+        return value
+
+
+_questions_adapter = TypeAdapter(List[AssignmentQuestionSchema])
 
 class StudentResponseSchema(BaseModel):
     assignment_id: int
@@ -31,41 +50,157 @@ class StudentResponseSchema(BaseModel):
     file_url: Optional[str] = None
   
 
-@router.get("/{user_id}/assignments")
-def get_student_assignments(user_id: int, db: Session = Depends(get_db)):
-    student = db.query(Student).filter(Student.user_id == user_id).first()
+def student_by_user_query(user_id: int):
+    return select(Student).where(Student.user_id == user_id)
+
+
+def student_assignments_query(class_id: int):
+    return (
+        select(Assignment.id, Assignment.title, Assignment.subject, Assignment.assignment_type, Assignment.due_date)
+        .where(Assignment.class_id == class_id)
+    )
+
+
+def assignment_questions_query(assignment_id: int):
+    return select(
+        AssignmentQuestion.id,
+        AssignmentQuestion.assignment_id,
+        AssignmentQuestion.question_text,
+        AssignmentQuestion.options,
+        AssignmentQuestion.correct_answer,
+        AssignmentQuestion.marks,
+    ).where(AssignmentQuestion.assignment_id == assignment_id)
+
+
+def _resolve_student(user_id: int, identity: Optional[Identity], db: Session):
+    if identity and identity.user_id == user_id and identity.class_id is not None:
+        return identity.student_id, identity.class_id
+    student = db.scalars(student_by_user_query(user_id)).first()
     if not student or not student.class_id:
         raise HTTPException(status_code=404, detail="Student or class not found")
+    return student.id, student.class_id
 
-    assignments = db.query(Assignment).filter(Assignment.class_id == student.class_id).all()
 
-    return [
-        {
-            "id": a.id,
-            "title": a.title,
-            "subject": a.subject,
-            "assignment_type": a.assignment_type.value,
-            "due_date": a.due_date
-        } for a in assignments
-    ]
+@router.get("/{user_id}/assignments")
+def get_student_assignments(
+    user_id: int,
+    identity: Optional[Identity] = Depends(get_optional_identity),
+    db: Session = Depends(get_read_db)
+):
+    _, class_id = _resolve_student(user_id, identity, db)
+
+    return FastJSONResponse(row_dicts(db.execute(student_assignments_query(class_id))))
+
+
+
+# Assignments without a due date sort after every dated one
+_NO_DUE_DATE = datetime(9999, 12, 31)
 
 
+def _dashboard_cursor(due_date: Optional[datetime], assignment_id: int) -> str:
+    return f"{(due_date or _NO_DUE_DATE).isoformat()}|{assignment_id}"
+
+
+def dashboard_query(student_id: int, class_id: int, after: Optional[tuple] = None, limit: int = 50):
+    class_assignments = select(Assignment.id).where(Assignment.class_id == class_id)
+    totals = (
+        select(
+            AssignmentQuestion.assignment_id,
+            func.count(AssignmentQuestion.id).label("question_count"),
+            func.sum(AssignmentQuestion.marks).label("total_marks"),
+        )
+        .where(AssignmentQuestion.assignment_id.in_(class_assignments))
+        .group_by(AssignmentQuestion.assignment_id)
+        .subquery()
+    )
+    progress = (
+        select(
+            StudentResponse.assignment_id,
+            func.count(StudentResponse.id).label("answered"),
+            func.count(StudentResponse.obtained_marks).label("graded_count"),
+            func.sum(StudentResponse.obtained_marks).label("obtained_marks"),
+        )
+        .where(StudentResponse.student_id == student_id)
+        .group_by(StudentResponse.assignment_id)
+        .subquery()
+    )
+    due_key = func.coalesce(Assignment.due_date, literal(_NO_DUE_DATE))
+    stmt = (
+        select(
+            Assignment.id,
+            Assignment.title,
+            Assignment.subject,
+            Assignment.assignment_type,
+            Assignment.due_date,
+            totals.c.question_count,
+            totals.c.total_marks,
+            progress.c.answered,
+            progress.c.graded_count,
+            progress.c.obtained_marks,
+        )
+        .outerjoin(totals, totals.c.assignment_id == Assignment.id)
+        .outerjoin(progress, progress.c.assignment_id == Assignment.id)
+        .where(Assignment.class_id == class_id)
+        .order_by(due_key, Assignment.id)
+        .limit(limit)
+    )
+    if after:
+        after_due, after_id = after
+        stmt = stmt.where(or_(due_key > after_due, and_(due_key == after_due, Assignment.id > after_id)))
+    return stmt
+
+
+@router.get("/{user_id}/dashboard")
+def get_student_dashboard(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    identity: Optional[Identity] = Depends(get_optional_identity),
+    db: Session = Depends(get_db)
+):
+    student_id, class_id = _resolve_student(user_id, identity, db)
+
+    after = None
+    if cursor:
+        try:
+            due_text, after_id = cursor.rsplit("|", 1)
+            after = (datetime.fromisoformat(due_text), int(after_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    rows = db.execute(dashboard_query(student_id, class_id, after, limit)).all()
+    now = datetime.now()
+    items = []
+    for row in rows:
+        answered = row.answered or 0
+        items.append({
+            "id": row.id,
+            "title": row.title,
+            "subject": row.subject,
+            "assignment_type": row.assignment_type.value,
+            "due_date": row.due_date,
+            "time_left_seconds": int((row.due_date - now).total_seconds()) if row.due_date else None,
+            "submitted": answered > 0,
+            "answered": answered,
+            "question_count": row.question_count or 0,
+            "obtained_marks": row.obtained_marks or 0,
+            "total_marks": row.total_marks or 0,
+            "graded": answered > 0 and row.graded_count == answered,
+        })
+
+    next_cursor = _dashboard_cursor(rows[-1].due_date, rows[-1].id) if len(rows) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
 @router.get("/{assignment_id}/questions", response_model=List[AssignmentQuestionSchema])
-def get_assignment_questions(assignment_id: int, db: Session = Depends(get_db)):
-    questions = db.query(AssignmentQuestion).filter(AssignmentQuestion.assignment_id == assignment_id).all()
+def get_assignment_questions(assignment_id: int, db: Session = Depends(get_read_db)):
+    questions = row_dicts(db.execute(assignment_questions_query(assignment_id)))
 
     if not questions:
         raise HTTPException(status_code=404, detail="Assignment not found")
 
-    # 🔁 Convert stringified options to real list
-    for q in questions:
-        if isinstance(q.options, str):
-            try:
-                q.options = json.loads(q.options)
-            except json.JSONDecodeError:
-                q.options = []  # fallback to empty list if invalid JSON
-
-    return questions
+    # validated and encoded in one pass by pydantic-core; returning a Response
+    # keeps FastAPI from validating the list a second time for response_model
+    return Response(_questions_adapter.dump_json(_questions_adapter.validate_python(questions)), media_type="application/json")
 
 
 # Endpoint to submit student responses
@@ -75,28 +210,89 @@ async def submit_student_responses(
     student_id: int = Form(...),
     responses: str = Form(...),  # JSON string of responses
     files: List[UploadFile] = File(None),
+    idempotency_key: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
     import json
     response_data = json.loads(responses)  # Expecting a list of dicts with question_id and response
 
+    if idempotency_key and _already_submitted(db, student_id, assignment_id, idempotency_key):
+        return {"message": "Responses already submitted", "duplicate": True}
+
     file_mapping = {}
     if files:
-        for file in files:
-            file_location = f"uploads/{file.filename}"
-            with open(file_location, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            file_mapping[file.filename] = file_location
+        budget = UploadBudget()
+        try:
+            for file in files:
+                stored = await save_upload(file, budget)
+                file_mapping[file.filename] = stored.url
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
 
+    submitted_at = datetime.now()
+    rows = {}
     for resp in response_data:
         file_url = file_mapping.get(resp.get("file_name")) if resp.get("file_name") else None
-        student_response = StudentResponse(
-            assignment_id=assignment_id,
-            question_id=resp["question_id"],
-            student_id=student_id,
-            response=resp.get("response"),
-            file_url=file_url
-        )
-        db.add(student_response)
-    db.commit()
-    return {"message": "Responses submitted successfully"}
\ No newline at end of file
+        # the last answer wins if a question appears twice in one submission
+        rows[resp["question_id"]] = {
+            "assignment_id": assignment_id,
+            "question_id": resp["question_id"],
+            "student_id": student_id,
+            "response": resp.get("response"),
+            "file_url": file_url,
+            "obtained_marks": None,
+            "reviewed_by_ai": False,
+            "submitted_at": submitted_at
+        }
+
+    try:
+        if idempotency_key:
+            db.add(SubmissionReceipt(idempotency_key=idempotency_key, student_id=student_id, assignment_id=assignment_id))
+            db.flush()
+        if rows:
+            # re-submitting resets graded answers, so take them out of the summaries too
+            old_scores = student_scores(db, assignment_id, student_id)
+            db.execute(_upsert_responses_stmt(db), list(rows.values()))
+            if old_scores:
+                apply_student_change(db, assignment_id, student_id, old_scores)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        if idempotency_key and _already_submitted(db, student_id, assignment_id, idempotency_key):
+            return {"message": "Responses already submitted", "duplicate": True}
+        if idempotency_key and _already_submitted(db, student_id, None, idempotency_key):
+            raise HTTPException(status_code=409, detail="Idempotency key already used for another assignment")
+        raise
+    return {"message": "Responses submitted successfully"}
+
+
+def receipt_query(student_id: int, assignment_id: Optional[int], idempotency_key: str):
+    # keys are only unique per student, so two students may send the same one
+    stmt = select(SubmissionReceipt.id).where(
+        SubmissionReceipt.student_id == student_id,
+        SubmissionReceipt.idempotency_key == idempotency_key,
+    )
+    if assignment_id is not None:
+        stmt = stmt.where(SubmissionReceipt.assignment_id == assignment_id)
+    return stmt
+
+
+def _already_submitted(db: Session, student_id: int, assignment_id: Optional[int], idempotency_key: str) -> bool:
+    return db.execute(receipt_query(student_id, assignment_id, idempotency_key)).first() is not None
+
+
+_UPSERT_COLUMNS = ("assignment_id", "response", "file_url", "obtained_marks", "reviewed_by_ai", "submitted_at")
+
+
+def _upsert_responses_stmt(db: Session):
+    # A re-submitted answer replaces the old one and goes back to ungraded.
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(StudentResponse)
+        return stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in _UPSERT_COLUMNS})
+    dialect_insert = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}[dialect]
+    stmt = dialect_insert(StudentResponse)
+    return stmt.on_conflict_do_update(
+        index_elements=["student_id", "question_id"],
+        set_={col: stmt.excluded[col] for col in _UPSERT_COLUMNS}
+    )
\ No newline at end of file
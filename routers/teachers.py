@@ -1,20 +1,30 @@
+import asyncio
+from contextlib import aclosing
 from datetime import datetime
 import json
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import Dict, List, Optional, Union
+from pydantic import BaseModel, ConfigDict
 from requests import Session
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException, Request
-import google.generativeai as genai
-from utils.prompt_template import generate_mcq_prompt,generate_descriptive_prompt, generate_math_problem_prompt, correction_prompt
-from services.ai_service import generate_from_prompt
+from sqlalchemy import insert, select
+from database import get_db, get_read_db, SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from utils.prompt_template import question_generation_prompt
+from services.ai_service import generate_from_prompt, get_llm_client, llm_http_error, LLMError
+from services.generation_cache import question_cache, question_cache_key, normalize_question_request
+from services.grading import grade_assignment, grade_submission
+from services.grading_queue import enqueue, job_status, retry_dead_job
+from services.structured_output import parse_items, parse_json_array, stream_items
+from services.question_bank import DuplicateFilter, as_generated, bank_search_query, generated_text, index_questions, take_from_bank
+from services.analytics import apply_student_change, student_scores
+from utils.responses import FastJSONResponse
 import models 
 import os
 
 
 class QuestionPayload(BaseModel):
     question_text: str
-    options: Optional[dict] = None
+    options: Optional[Union[List[str], Dict[str, str]]] = None
     correct_answer: Optional[str] = None
     marks: int
 
@@ -26,9 +36,23 @@ class AssignmentPayload(BaseModel):
     assignment_type: str  # "mcq", "description", or "file"
     due_date: Optional[datetime]
     questions: List[QuestionPayload]
+    topic: Optional[str] = None  # question bank topic; defaults to the title
+
+class BulkAssignmentPayload(BaseModel):
+    class_ids: Optional[List[int]] = None
+    grade: Optional[str] = None  # publish to every section of this grade
+    teacher_id: int
+    title: str
+    subject: str
+    assignment_type: str
+    due_date: Optional[datetime] = None
+    questions: List[QuestionPayload]
+    topic: Optional[str] = None
 
 
 class StudentResponseSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     assignment_id: int
     question_id: int
@@ -39,9 +63,6 @@ class StudentResponseSchema(BaseModel):
     reviewed_by_ai: bool
     submitted_at: datetime
 
-    class Config:
-        orm_mode = True
-
 class GradeUpdateSchema(BaseModel):
     obtained_marks: int
     reviewed_by_ai: Optional[bool] = False
@@ -64,29 +85,230 @@ async def generate_questions(request: Request):
     if not topic:
         raise HTTPException(status_code=400, detail="Topic is required")
 
-    if type == "mcq":
-      prompt = generate_mcq_prompt(count,topic,grade,description)
-    elif type == "prob":
-      prompt = generate_math_problem_prompt(count,topic,grade,description)
-    else:
-      prompt = generate_descriptive_prompt(count,topic,grade,description)
+    normalized = normalize_question_request(type, count, topic, grade, description)
+    served = await asyncio.to_thread(_served_from_bank, normalized, data)
+    if served and len(served) >= normalized[1]:
+        return {"questions": json.dumps([as_generated(row) for row in served]), "source": "bank", "from_bank": len(served)}
+
+    # only the questions the bank couldn't supply go to the model
+    model_request = (normalized[0], normalized[1] - len(served) if served else normalized[1], *normalized[2:])
+    prompt = question_generation_prompt(*model_request)
     try:
-        response = generate_from_prompt(prompt)
-        raw_output = response.text
+        raw_output = await question_cache.get_or_create(
+            question_cache_key(*model_request),
+            lambda: generate_from_prompt(prompt),
+        )
     except Exception as e:
       print(f"AI model error: {str(e)}")
       raise HTTPException(status_code=500, detail=f"AI model error: {str(e)}")
 
-    return {"questions": raw_output}
+    if not served:
+        return {"questions": raw_output, "source": "model", "from_bank": 0}
+
+    try:
+        generated = parse_json_array(raw_output)
+    except ValueError as e:
+        print(f"Unreadable top-up questions: {str(e)}")
+        generated = []
+    duplicates = DuplicateFilter(served)
+    generated = [item for item in generated if duplicates.admit(generated_text(item))][:model_request[1]]
+    questions = [as_generated(row) for row in served] + generated
+    return {"questions": json.dumps(questions), "source": "bank+model", "from_bank": len(served)}
+
+
+def _served_from_bank(normalized: tuple, data: dict):
+    question_type, count, topic, grade, description = normalized
+    # the bank only matches topic and grade; specific instructions need fresh questions
+    if not count or description or not data.get("use_bank", True):
+        return []
+    # runs in a worker thread with its own session; rows stay readable after the commit
+    with SessionLocal(expire_on_commit=False) as db:
+        return take_from_bank(db, question_type, topic, grade, count, data.get("subject"))
+
+# marks given to generated questions; the prompts don't ask the model for them
+GENERATED_QUESTION_MARKS = {"mcq": 1, "prob": 5, "description": 5}
+
+
+def generated_question_adapter(question_type: str):
+    # map the keys the generation prompts ask for onto QuestionPayload
+    def prepare(item):
+        if isinstance(item, str):
+            item = {"question": item}
+        if not isinstance(item, dict):
+            raise ValueError("Each question must be a JSON object")
+        return {
+            "question_text": item.get("question_text") or item.get("question"),
+            "options": item.get("options"),
+            "correct_answer": item.get("correct_answer") or item.get("answer"),
+            "marks": item.get("marks") or GENERATED_QUESTION_MARKS[question_type],
+        }
+    return prepare
+
+
+@router.post("/generate-questions/stream")
+async def generate_questions_stream(request: Request):
+    data = await request.json()
+    if not data.get("topic"):
+        raise HTTPException(status_code=400, detail="Topic is required")
+
+    normalized = normalize_question_request(
+        data.get("type"), data.get("count"), data.get("topic"), data.get("grade", "general"), data.get("description")
+    )
+    served = await asyncio.to_thread(_served_from_bank, normalized, data)
+    bank_questions = [as_generated(row) for row in served]
+    remaining = normalized[1] - len(served) if served else normalized[1]
+    model_request = (normalized[0], remaining, *normalized[2:])
+    prompt = question_generation_prompt(*model_request)
+    cache_key = question_cache_key(*model_request)
+    prepare = generated_question_adapter(normalized[0])
+    duplicates = DuplicateFilter(served)
+
+    def line(event: str, **fields) -> str:
+        return json.dumps({"event": event, **fields}, default=str) + "\n"
+
+    async def events():
+        emitted = invalid = 0
+        for index, item in enumerate(bank_questions):
+            emitted += 1
+            yield line("question", index=index, source="bank", question=prepare(item))
+        if served and remaining <= 0:
+            yield line("done", count=emitted, invalid=0, from_bank=len(served), cached=False)
+            return
+
+        cached = question_cache.get(cache_key)
+        raw_parts = []
+        truncated = False
+
+        async def chunks():
+            async with aclosing(get_llm_client().stream(prompt)) as upstream:
+                async for chunk in upstream:
+                    raw_parts.append(chunk)
+                    yield chunk
+
+        async def replay_cached():
+            for index, (question, error) in enumerate(parse_items(cached, QuestionPayload, prepare)):
+                yield index, question, error
+
+        try:
+            results = replay_cached() if cached is not None else stream_items(chunks(), QuestionPayload, prepare)
+            async with aclosing(results):
+                async for index, question, error in results:
+                    if question is None:
+                        invalid += 1
+                        yield line("invalid", index=len(served) + index, error=error)
+                    elif duplicates.admit(question.question_text):
+                        emitted += 1
+                        yield line("question", index=len(served) + index, source="model", question=question.model_dump())
+                        if served and emitted >= normalized[1]:
+                            truncated = True
+                            break
+        except Exception as e:
+            print(f"AI model error: {str(e)}")
+            yield line("error", detail=f"AI model error: {str(e)}")
+            return
+        if cached is None and not truncated and emitted > len(served):
+            question_cache.set(cache_key, "".join(raw_parts))
+        yield line("done", count=emitted, invalid=invalid, from_bank=len(served), cached=cached is not None)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.get("/question-bank")
+def search_question_bank(
+    topic: str,
+    type: str = "mcq",
+    grade: str = "general",
+    subject: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+):
+    stmt = bank_search_query(type, topic, grade, limit, subject)
+    rows = db.scalars(stmt).all() if stmt is not None else []
+    return {"items": [
+        {
+            "id": row.id,
+            "question_type": row.question_type,
+            "subject": row.subject,
+            "topic": row.topic,
+            "grade": row.grade,
+            "question_text": row.question_text,
+            "options": row.options,
+            "correct_answer": row.correct_answer,
+            "marks": row.marks,
+            "times_served": row.times_served,
+        }
+        for row in rows
+    ]}
+
+
+@router.get("/generate-questions/cache-stats")
+def generation_cache_stats():
+    return question_cache.stats()
+
+def class_by_section_query(grade: str, section: str):
+    return select(models.Class).where(models.Class.grade == grade, models.Class.section == section)
+
+
+def grade_classes_query(grade: str):
+    return select(models.Class.id).where(models.Class.grade == grade).order_by(models.Class.section)
+
+
+def teacher_assignments_query(teacher_id: int):
+    # one query with the class joined in, instead of a class lookup per assignment
+    return (
+        select(
+            models.Assignment.id,
+            models.Assignment.title,
+            models.Assignment.subject,
+            models.Class.grade,
+            models.Class.section,
+        )
+        .outerjoin(models.Class, models.Class.id == models.Assignment.class_id)
+        .where(models.Assignment.teacher_id == teacher_id)
+    )
+
 
 @router.get("/get-class-id")
-def get_class_id(grade: str, section: str, db: Session = Depends(get_db)):
-    class_obj = db.query(models.Class).filter_by(grade=grade, section=section).first()
+def get_class_id(grade: str, section: str, db: Session = Depends(get_read_db)):
+    class_obj = db.scalars(class_by_section_query(grade, section)).first()
     if not class_obj:
         raise HTTPException(status_code=404, detail="Class not found")
     return {"class_id": class_obj.id}
 
 
+def _question_rows(assignment_ids: List[int], questions: List[dict]) -> List[dict]:
+    return [
+        {
+            "assignment_id": assignment_id,
+            "question_text": q["question_text"],
+            "options": q.get("options"),
+            "correct_answer": q.get("correct_answer"),
+            "marks": q["marks"]
+        }
+        for assignment_id in assignment_ids
+        for q in questions
+    ]
+
+
+def _insert_assignments(db: Session, rows: List[dict]) -> List[int]:
+    if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        stmt = insert(models.Assignment).returning(models.Assignment.id, sort_by_parameter_order=True)
+        return list(db.scalars(stmt, rows))
+    # MySQL has no INSERT ... RETURNING, so assignments go in one statement
+    # per class; their questions are still written as a single batch.
+    return [db.execute(insert(models.Assignment).values(**row)).inserted_primary_key[0] for row in rows]
+
+
+def _index_published(db: Session, assignment_type: str, subject: str, topic: str, class_ids: List[int], questions: List[dict]):
+    # the bank is a cache of past work; failing to index must never block publishing
+    try:
+        grades = list(db.scalars(select(models.Class.grade).where(models.Class.id.in_(class_ids)).distinct()))
+        with db.begin_nested():
+            index_questions(db, assignment_type, subject, topic, grades, questions)
+    except Exception as e:
+        print(f"Question bank indexing failed: {str(e)}")
+
+
 @router.post("/send-assignment")
 async def send_assignment(request: Request, db: Session = Depends(get_db)):
     try:
@@ -111,19 +333,11 @@ async def send_assignment(request: Request, db: Session = Depends(get_db)):
         db.add(new_assignment)
         db.flush()  # get assignment ID
 
-        for q in data["questions"]:
-            question_kwargs = {
-                "assignment_id": new_assignment.id,
-                "question_text": q["question_text"],
-                "marks": q["marks"]
-            }
-            if "options" in q:
-                question_kwargs["options"] = q["options"]
-            if "correct_answer" in q:
-                question_kwargs["correct_answer"] = q["correct_answer"]
-
-            question = models.AssignmentQuestion(**question_kwargs)
-            db.add(question)
+        question_rows = _question_rows([new_assignment.id], data["questions"])
+        if question_rows:
+            db.execute(insert(models.AssignmentQuestion), question_rows)
+            _index_published(db, data["assignment_type"], data["subject"], data.get("topic") or data["title"],
+                             [data["class_id"]], data["questions"])
 
         db.commit()
         return {"message": "Assignment successfully posted"}
@@ -134,87 +348,224 @@ async def send_assignment(request: Request, db: Session = Depends(get_db)):
 
 
 
+@router.post("/send-assignment/bulk")
+def send_assignment_bulk(payload: BulkAssignmentPayload, db: Session = Depends(get_db)):
+    if payload.class_ids:
+        class_ids = list(dict.fromkeys(payload.class_ids))
+        found = set(db.scalars(select(models.Class.id).where(models.Class.id.in_(class_ids))))
+        missing = [class_id for class_id in class_ids if class_id not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Classes not found: {missing}")
+    elif payload.grade:
+        class_ids = list(db.scalars(grade_classes_query(payload.grade)))
+        if not class_ids:
+            raise HTTPException(status_code=404, detail="No classes found for this grade")
+    else:
+        raise HTTPException(status_code=400, detail="Either class_ids or grade is required")
+
+    try:
+        assignment_type = models.AssignmentType(payload.assignment_type)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid assignment type")
+
+    created_at = datetime.now()
+    assignment_rows = [
+        {
+            "title": payload.title,
+            "subject": payload.subject,
+            "teacher_id": payload.teacher_id,
+            "class_id": class_id,
+            "due_date": payload.due_date,
+            "assignment_type": assignment_type,
+            "created_at": created_at
+        }
+        for class_id in class_ids
+    ]
+
+    try:
+        assignment_ids = _insert_assignments(db, assignment_rows)
+        questions = [q.model_dump() for q in payload.questions]
+        question_rows = _question_rows(assignment_ids, questions)
+        if question_rows:
+            db.execute(insert(models.AssignmentQuestion), question_rows)
+            _index_published(db, assignment_type.value, payload.subject, payload.topic or payload.title, class_ids, questions)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Assignment failed: {str(e)}")
+
+    return {
+        "message": f"Assignment posted to {len(assignment_ids)} classes",
+        "assignments": [
+            {"class_id": class_id, "assignment_id": assignment_id}
+            for class_id, assignment_id in zip(class_ids, assignment_ids)
+        ]
+    }
+
+
 @router.get("/assignments/{teacher_id}")
-def get_assignments_by_teacher(teacher_id: int, db: Session = Depends(get_db)):
-    assignments = db.query(models.Assignment).filter(models.Assignment.teacher_id == teacher_id).all()
-    result = []
-    for assignment in assignments:
-        class_info = db.query(models.Class).filter(models.Class.id == assignment.class_id).first()
-        result.append({
-            "id": assignment.id,
-            "title": assignment.title,
-            "subject": assignment.subject,
-            "class_name": f"{class_info.grade} {class_info.section}" if class_info else "N/A"
-        })
-    return result
+def get_assignments_by_teacher(teacher_id: int, db: Session = Depends(get_read_db)):
+    rows = db.execute(teacher_assignments_query(teacher_id))
+    return FastJSONResponse([
+        {
+            "id": assignment_id,
+            "title": title,
+            "subject": subject,
+            "class_name": f"{grade} {section}" if grade is not None else "N/A"
+        }
+        for assignment_id, title, subject, grade, section in rows
+    ])
+
+def _submissions_query(
+    assignment_id: int,
+    ungraded: bool = False,
+    question_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+):
+    stmt = (
+        select(
+            models.StudentResponse.id,
+            models.StudentResponse.student_id,
+            models.StudentResponse.question_id,
+            models.User.username,
+            models.AssignmentQuestion.question_text,
+            models.StudentResponse.response,
+            models.StudentResponse.obtained_marks,
+        )
+        .outerjoin(models.AssignmentQuestion, models.AssignmentQuestion.id == models.StudentResponse.question_id)
+        .outerjoin(models.Student, models.Student.id == models.StudentResponse.student_id)
+        .outerjoin(models.User, models.User.id == models.Student.user_id)
+        .where(models.StudentResponse.assignment_id == assignment_id)
+        .order_by(models.StudentResponse.id)
+    )
+    if ungraded:
+        stmt = stmt.where(models.StudentResponse.obtained_marks.is_(None))
+    if question_id is not None:
+        stmt = stmt.where(models.StudentResponse.question_id == question_id)
+    if student_id is not None:
+        stmt = stmt.where(models.StudentResponse.student_id == student_id)
+    return stmt
+
+
+def _submission_row(row):
+    return {
+        "id": row.id,
+        "student_id": row.student_id,
+        "question_id": row.question_id,
+        "student_name": row.username if row.username is not None else "Unknown",
+        "question_text": row.question_text if row.question_text is not None else "Unknown",
+        "response": row.response,
+        "obtained_marks": row.obtained_marks
+    }
+
 
 @router.get("/assignments/{assignment_id}/submissions")
-def get_submissions_by_assignment(assignment_id: int, db: Session = Depends(get_db)):
-    responses = db.query(models.StudentResponse).filter(models.StudentResponse.assignment_id == assignment_id).all()
-    result = []
-    for response in responses:
-        question = db.query(models.AssignmentQuestion).filter(models.AssignmentQuestion.id == response.question_id).first()
-        student = db.query(models.Student).filter(models.Student.id == response.student_id).first()
-        user = db.query(models.User).filter(models.User.id == student.user_id).first() if student else None
-        result.append({
-            "id": response.id,
-            "student_name": user.username if user else "Unknown",
-            "question_text": question.question_text if question else "Unknown",
-            "response": response.response,
-            "obtained_marks": response.obtained_marks
-        })
-    return result
+def get_submissions_by_assignment(
+    assignment_id: int,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    ungraded: bool = False,
+    question_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    stream: bool = False,
+    db: Session = Depends(get_db)
+):
+    stmt = _submissions_query(assignment_id, ungraded, question_id, student_id)
+    if after_id is not None:
+        stmt = stmt.where(models.StudentResponse.id > after_id)
+
+    if stream:
+        # The request-scoped session is closed before the body is sent,
+        # so the stream owns its own session and reads with a server-side cursor.
+        def iter_rows():
+            with SessionLocal() as stream_db:
+                for row in stream_db.execute(stmt.execution_options(yield_per=500)):
+                    yield json.dumps(_submission_row(row)) + "\n"
+        return StreamingResponse(iter_rows(), media_type="application/x-ndjson")
+
+    rows = db.execute(stmt.limit(limit)).all()
+    items = [_submission_row(row) for row in rows]
+    next_cursor = rows[-1].id if len(rows) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.post("/submissions/{submission_id}/evaluate")
-def evaluate_submission(submission_id: int, db: Session = Depends(get_db)):
-    submission = db.query(models.StudentResponse).filter(models.StudentResponse.id == submission_id).first()
-    if not submission:
+async def evaluate_submission(submission_id: int, db: Session = Depends(get_db)):
+    try:
+        return await grade_submission(db, submission_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except LLMError as e:
+        raise llm_http_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/assignments/{assignment_id}/evaluate")
+async def evaluate_assignment(assignment_id: int, db: Session = Depends(get_db)):
+    try:
+        return await grade_assignment(db, assignment_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except LLMError as e:
+        raise llm_http_error(e)
+
+
+@router.post("/submissions/{submission_id}/evaluate-async", status_code=202)
+def evaluate_submission_async(submission_id: int, db: Session = Depends(get_db)):
+    if db.get(models.StudentResponse, submission_id) is None:
         raise HTTPException(status_code=404, detail="Submission not found")
+    return job_status(enqueue(db, "submission", submission_id))
 
-    question = db.query(models.AssignmentQuestion).filter(models.AssignmentQuestion.id == submission.question_id).first()
-    assignment = db.query(models.Assignment).filter(models.Assignment.id == submission.assignment_id).first()
 
-    if not question or not assignment:
-        raise HTTPException(status_code=404, detail="Assignment or Question not found")
+@router.post("/assignments/{assignment_id}/evaluate-async", status_code=202)
+def evaluate_assignment_async(assignment_id: int, db: Session = Depends(get_db)):
+    if db.get(models.Assignment, assignment_id) is None:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+    return job_status(enqueue(db, "assignment", assignment_id))
 
-    assignment_type = assignment.assignment_type
 
-    if assignment_type == models.AssignmentType.mcq:
-        is_correct = submission.response.strip().lower() == question.correct_answer.strip().lower()
-        submission.obtained_marks = question.marks if is_correct else 0
-        submission.reviewed_by_ai = True
+@router.get("/grading-jobs/{job_id}")
+def get_grading_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(models.GradingJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Grading job not found")
+    return job_status(job)
 
-    elif assignment_type == models.AssignmentType.description:
-        propmt =  correction_prompt(
-            question=question.question_text,
-            answer=submission.response,
-            marks=question.marks
-        )
-        response = generate_from_prompt(propmt)
-        try:
-            result = json.loads(response)
-            score = int(result.get("score", 0))
-            feedback = result.get("feedback", "")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"AI response parsing failed: {str(e)}")
-        submission.obtained_marks = score
-        submission.reviewed_by_ai = True
 
-    elif assignment_type in [models.AssignmentType.file, models.AssignmentType.prob]:
-        # For manual review types
-        submission.reviewed_by_ai = False
-        submission.obtained_marks = None
+@router.post("/grading-jobs/{job_id}/retry", status_code=202)
+def retry_grading_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(models.GradingJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Grading job not found")
+    if job.status != models.GradingJobStatus.dead:
+        raise HTTPException(status_code=409, detail="Only dead jobs can be retried")
+    return job_status(retry_dead_job(db, job))
 
+
+@router.patch("/submissions/{submission_id}/grade")
+def update_submission_grade(submission_id: int, payload: GradeUpdateSchema, db: Session = Depends(get_db)):
+    submission = db.query(models.StudentResponse).filter(models.StudentResponse.id == submission_id).first()
+    if not submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+    max_marks = db.execute(
+        select(models.AssignmentQuestion.marks).where(models.AssignmentQuestion.id == submission.question_id)
+    ).scalar()
+    if payload.obtained_marks < 0 or (max_marks is not None and payload.obtained_marks > max_marks):
+        raise HTTPException(status_code=400, detail=f"obtained_marks must be between 0 and {max_marks}")
+
+    old_scores = student_scores(db, submission.assignment_id, submission.student_id)
+    submission.obtained_marks = payload.obtained_marks
+    submission.reviewed_by_ai = payload.reviewed_by_ai or False
+    db.flush()
+    apply_student_change(db, submission.assignment_id, submission.student_id, old_scores)
     db.commit()
-    db.refresh(submission)
 
     return {
         "id": submission.id,
-        "question_text": question.question_text,
-        "response": submission.response,
+        "student_id": submission.student_id,
+        "question_id": submission.question_id,
         "obtained_marks": submission.obtained_marks,
         "reviewed_by_ai": submission.reviewed_by_ai,
-        "student_id": submission.student_id,
-        "assignment_type": assignment_type.value
-    }
\ No newline at end of file
+    }
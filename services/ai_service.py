@@ -1,14 +1,270 @@
+import asyncio
+import json
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv 
+import random
+import re
+import time
+import weakref
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Optional, Union
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from services.metrics import llm_first_chunk_seconds, record_llm_call
 
 load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.0-flash")
 
-def generate_from_prompt(prompt: str) -> str:
-    response = model.generate_content(prompt)
-    return response
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")  # "gemini" or "fake"
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "8"))
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0"))
+FAKE_LLM_JITTER = float(os.getenv("FAKE_LLM_JITTER", "0"))  # extra uniform 0..jitter seconds per call
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))  # share of calls answered with a 429
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# A prompt string, or a Gemini-style list of {"role": ..., "parts": [...]} turns.
+Contents = Union[str, list]
+
+
+class LLMError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def llm_http_error(e: LLMError) -> HTTPException:
+    # the model is an upstream service: a timeout there is ours to report as 504, anything else as 502
+    return HTTPException(status_code=504 if e.status_code == 504 else 502, detail=f"AI model error: {str(e)}")
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+
+
+class GeminiBackend:
+    def __init__(self, api_key: Optional[str] = None, model_name: str = GEMINI_MODEL):
+        import google.generativeai as genai
+
+        # configure() builds one process-wide client; every model below
+        # shares its channel instead of each router opening its own.
+        genai.configure(api_key=api_key or os.getenv("GEMINI_API_KEY"))
+        self._genai = genai
+        self.model_name = model_name
+        self._models = {}
+
+    def _model(self, system_instruction: Optional[str]):
+        key = system_instruction or ""
+        if key not in self._models:
+            self._models[key] = self._genai.GenerativeModel(self.model_name, system_instruction=system_instruction)
+        return self._models[key]
+
+    async def generate(self, contents: Contents, system_instruction: Optional[str] = None, timeout: Optional[float] = None) -> LLMResponse:
+        try:
+            response = await self._model(system_instruction).generate_content_async(
+                contents, request_options={"timeout": timeout}
+            )
+            text = response.text
+        except Exception as e:
+            code = getattr(e, "code", None)
+            raise LLMError(str(e), status_code=code if isinstance(code, int) else None) from e
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            text=text,
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+        )
+
+    async def stream(self, contents: Contents, system_instruction: Optional[str] = None, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        try:
+            response = await self._model(system_instruction).generate_content_async(
+                contents, stream=True, request_options={"timeout": timeout}
+            )
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            code = getattr(e, "code", None)
+            raise LLMError(str(e), status_code=code if isinstance(code, int) else None) from e
+
+
+def _last_prompt(contents: Contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    return " ".join(str(part) for part in contents[-1]["parts"])
+
+
+def default_fake_responder(prompt: str) -> str:
+    answer_ids = re.findall(r'^\{"id": (\d+), "answer": ', prompt, re.M)
+    if answer_ids:
+        return json.dumps([{"id": int(i), "score": 0, "feedback": "Graded by the fake LLM backend."} for i in answer_ids])
+    if '"score"' in prompt:
+        return json.dumps({"score": 0, "feedback": "Graded by the fake LLM backend."})
+    if "JSON array" in prompt:
+        return json.dumps([{"question": "What is a fake question?", "options": ["A", "B", "C", "D"], "answer": "A"}])
+    return "This is a response from the fake LLM backend."
+
+
+class FakeBackend:
+    """Offline backend for load tests: fixed latency, canned or scripted replies."""
+
+    def __init__(
+        self,
+        latency: float = FAKE_LLM_LATENCY,
+        responder: Optional[Callable[[str], str]] = None,
+        jitter: float = FAKE_LLM_JITTER,
+        error_rate: float = FAKE_LLM_ERROR_RATE,
+    ):
+        self.latency = latency
+        self.responder = responder or default_fake_responder
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+
+    def _delay(self) -> float:
+        return self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            raise LLMError("Fake rate limit", status_code=429)
+
+    async def generate(self, contents: Contents, system_instruction: Optional[str] = None, timeout: Optional[float] = None) -> LLMResponse:
+        self.calls += 1
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        self._maybe_fail()
+        prompt = _last_prompt(contents)
+        text = self.responder(prompt)
+        return LLMResponse(text=text, prompt_tokens=len(prompt) // 4, output_tokens=len(text) // 4)
+
+    async def stream(self, contents: Contents, system_instruction: Optional[str] = None, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        self.calls += 1
+        self._maybe_fail()
+        words = self.responder(_last_prompt(contents)).split(" ")
+        delay = self._delay()
+        for i, word in enumerate(words):
+            if delay:
+                await asyncio.sleep(delay / len(words))
+            yield word if i == 0 else " " + word
+
+
+class LLMClient:
+    def __init__(
+        self,
+        backend,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_cap: float = LLM_BACKOFF_CAP,
+    ):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # asyncio primitives belong to one event loop; keep one limiter per loop
+        self._limiters = weakref.WeakKeyDictionary()
+
+    def _limiter(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        limiter = self._limiters.get(loop)
+        if limiter is None:
+            limiter = self._limiters[loop] = asyncio.Semaphore(self.max_concurrency)
+        return limiter
+
+    def _backoff(self, attempt: int) -> float:
+        # "full jitter": spreads retries from many callers hitting the same 429
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def generate(self, contents: Contents, system_instruction: Optional[str] = None, timeout: Optional[float] = None) -> LLMResponse:
+        timeout = timeout or self.timeout
+        attempt = 0
+        while True:
+            call_started = time.perf_counter()
+            try:
+                async with self._limiter():
+                    response = await asyncio.wait_for(
+                        self.backend.generate(contents, system_instruction=system_instruction, timeout=timeout),
+                        timeout,
+                    )
+                record_llm_call("generate", time.perf_counter() - call_started,
+                                prompt_tokens=response.prompt_tokens, output_tokens=response.output_tokens)
+                return response
+            except asyncio.TimeoutError:
+                error = LLMError(f"LLM call timed out after {timeout}s", status_code=504)
+            except LLMError as e:
+                error = e
+            record_llm_call("generate", time.perf_counter() - call_started, error_status=str(error.status_code or "unknown"))
+            if error.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                raise error
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def stream(self, contents: Contents, system_instruction: Optional[str] = None, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        # timeout bounds the wait for each chunk; retries only happen before the
+        # first chunk, since the caller may already have forwarded partial text
+        timeout = timeout or self.timeout
+        attempt = 0
+        while True:
+            started = False
+            call_started = time.perf_counter()
+            try:
+                async with self._limiter():
+                    chunks = self.backend.stream(contents, system_instruction=system_instruction, timeout=timeout)
+                    try:
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                            except StopAsyncIteration:
+                                record_llm_call("stream", time.perf_counter() - call_started)
+                                return
+                            if not started:
+                                llm_first_chunk_seconds.observe(time.perf_counter() - call_started)
+                            started = True
+                            yield chunk
+                    finally:
+                        # also runs when the consumer stops early (client disconnect)
+                        await chunks.aclose()
+            except asyncio.TimeoutError:
+                error = LLMError(f"LLM stream stalled for {timeout}s", status_code=504)
+            except LLMError as e:
+                error = e
+            record_llm_call("stream", time.perf_counter() - call_started, error_status=str(error.status_code or "unknown"))
+            if started or error.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                raise error
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+
+_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    global _client
+    if _client is None:
+        backend = FakeBackend() if LLM_BACKEND == "fake" else GeminiBackend()
+        _client = LLMClient(backend)
+    return _client
+
+
+def set_llm_backend(backend, **client_options) -> LLMClient:
+    global _client
+    _client = LLMClient(backend, **client_options)
+    return _client
+
+
+async def generate_from_prompt(prompt: str, system_instruction: Optional[str] = None) -> str:
+    response = await get_llm_client().generate(prompt, system_instruction=system_instruction)
+    return response.text
 
 def evaluate_description_answer(question,answer,marks):
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,293 @@
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+import models
+
+FETCH_PARTITION_SIZE = 100_000
+
+_QUESTION_SUMS = ("responses_scored", "score_sum", "score_sq_sum", "total_sum", "total_sq_sum", "cross_sum")
+
+
+def compute_stats(assignment_ids: np.ndarray, student_ids: np.ndarray, question_ids: np.ndarray, marks: np.ndarray):
+    """Summaries for a set of scored responses, given as parallel column arrays."""
+    if len(marks) == 0:
+        return {}, {}
+    marks = marks.astype(np.float64)
+
+    # student totals per (assignment, student)
+    pair_keys = assignment_ids.astype(np.int64) * (int(student_ids.max()) + 1) + student_ids
+    pairs, pair_index = np.unique(pair_keys, return_inverse=True)
+    totals = np.bincount(pair_index, weights=marks)
+    pair_assignments = pairs // (int(student_ids.max()) + 1)
+
+    assignments, assignment_index = np.unique(pair_assignments, return_inverse=True)
+    students_scored = np.bincount(assignment_index)
+    score_sum = np.bincount(assignment_index, weights=totals)
+    score_sq_sum = np.bincount(assignment_index, weights=totals * totals)
+
+    # histogram of integer totals per assignment
+    rounded = np.rint(totals).astype(np.int64)
+    bucket_keys = assignment_index.astype(np.int64) * (int(rounded.max()) + 1) + rounded
+    buckets, bucket_counts = np.unique(bucket_keys, return_counts=True)
+    histograms: Dict[int, dict] = {int(a): {} for a in assignments}
+    for key, count in zip(buckets.tolist(), bucket_counts.tolist()):
+        position, score = divmod(key, int(rounded.max()) + 1)
+        histograms[int(assignments[position])][str(score)] = count
+
+    assignment_stats = {
+        int(a): {
+            "students_scored": int(students_scored[i]),
+            "score_sum": float(score_sum[i]),
+            "score_sq_sum": float(score_sq_sum[i]),
+            "histogram": histograms[int(a)],
+        }
+        for i, a in enumerate(assignments)
+    }
+
+    # per-question sums, each response paired with its student's total
+    response_totals = totals[pair_index]
+    questions, question_index = np.unique(question_ids, return_inverse=True)
+    question_assignment = np.zeros(len(questions), dtype=np.int64)
+    question_assignment[question_index] = assignment_ids
+    sums = {
+        "responses_scored": np.bincount(question_index),
+        "score_sum": np.bincount(question_index, weights=marks),
+        "score_sq_sum": np.bincount(question_index, weights=marks * marks),
+        "total_sum": np.bincount(question_index, weights=response_totals),
+        "total_sq_sum": np.bincount(question_index, weights=response_totals * response_totals),
+        "cross_sum": np.bincount(question_index, weights=marks * response_totals),
+    }
+    question_stats = {
+        int(q): {"assignment_id": int(question_assignment[i]), **{k: float(v[i]) for k, v in sums.items()}}
+        for i, q in enumerate(questions)
+    }
+    for stats in question_stats.values():
+        stats["responses_scored"] = int(stats["responses_scored"])
+    return assignment_stats, question_stats
+
+
+def _fetch_columns(db: Session, assignment_ids: Optional[List[int]]):
+    stmt = select(
+        models.StudentResponse.assignment_id,
+        models.StudentResponse.student_id,
+        models.StudentResponse.question_id,
+        models.StudentResponse.obtained_marks,
+    ).where(models.StudentResponse.obtained_marks.isnot(None))
+    if assignment_ids is not None:
+        stmt = stmt.where(models.StudentResponse.assignment_id.in_(assignment_ids))
+    chunks = [
+        np.array(partition, dtype=np.int64).reshape(-1, 4)
+        for partition in db.execute(stmt.execution_options(yield_per=FETCH_PARTITION_SIZE)).partitions()
+    ]
+    columns = np.concatenate(chunks) if chunks else np.empty((0, 4), dtype=np.int64)
+    return columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3]
+
+
+def recompute_assignments(db: Session, assignment_ids: Optional[Iterable[int]] = None) -> int:
+    """Rebuild the summaries for the given assignments (all when None). Caller commits."""
+    assignment_ids = list(assignment_ids) if assignment_ids is not None else None
+    assignment_stats, question_stats = compute_stats(*_fetch_columns(db, assignment_ids))
+
+    clear_assignments, clear_questions = delete(models.AssignmentStats), delete(models.QuestionStats)
+    if assignment_ids is not None:
+        clear_assignments = clear_assignments.where(models.AssignmentStats.assignment_id.in_(assignment_ids))
+        clear_questions = clear_questions.where(models.QuestionStats.assignment_id.in_(assignment_ids))
+    db.execute(clear_assignments)
+    db.execute(clear_questions)
+
+    if assignment_stats:
+        class_ids = dict(db.execute(
+            select(models.Assignment.id, models.Assignment.class_id)
+            .where(models.Assignment.id.in_(list(assignment_stats)))
+        ).all())
+        now = datetime.now()
+        db.execute(insert(models.AssignmentStats), [
+            {"assignment_id": a, "class_id": class_ids[a], "updated_at": now, **stats}
+            for a, stats in assignment_stats.items()
+        ])
+        _insert_question_stats(db, question_stats, now)
+    return len(assignment_stats)
+
+
+def _insert_question_stats(db: Session, question_stats: dict, now: datetime):
+    if not question_stats:
+        return
+    max_marks = dict(db.execute(
+        select(models.AssignmentQuestion.id, models.AssignmentQuestion.marks)
+        .where(models.AssignmentQuestion.id.in_(list(question_stats)))
+    ).all())
+    db.execute(insert(models.QuestionStats), [
+        {"question_id": q, "max_marks": max_marks[q], "updated_at": now, **stats}
+        for q, stats in question_stats.items()
+    ])
+
+
+def _ensure_stats_row_stmt(db: Session, assignment_id: int, class_id: int):
+    # a new row has updated_at NULL until it is summarized; concurrent callers
+    # all run this, and all but one insert nothing
+    values = {"assignment_id": assignment_id, "class_id": class_id, "updated_at": None}
+    if db.get_bind().dialect.name == "mysql":
+        stmt = mysql.insert(models.AssignmentStats).values(values)
+        return stmt.on_duplicate_key_update(assignment_id=stmt.inserted.assignment_id)
+    dialect_insert = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}[db.get_bind().dialect.name]
+    return dialect_insert(models.AssignmentStats).values(values).on_conflict_do_nothing(index_elements=["assignment_id"])
+
+
+def _summarize_locked(db: Session, assignment_row: models.AssignmentStats):
+    # rebuilds one assignment in place, so callers waiting on the row lock find it afterwards
+    assignment_stats, question_stats = compute_stats(*_fetch_columns(db, [assignment_row.assignment_id]))
+    stats = assignment_stats.get(assignment_row.assignment_id, {"students_scored": 0, "score_sum": 0.0, "score_sq_sum": 0.0, "histogram": {}})
+    for column, value in stats.items():
+        setattr(assignment_row, column, value)
+    now = datetime.now()
+    assignment_row.updated_at = now
+    db.execute(delete(models.QuestionStats).where(models.QuestionStats.assignment_id == assignment_row.assignment_id))
+    _insert_question_stats(db, question_stats, now)
+
+
+def student_scores(db: Session, assignment_id: int, student_id: int) -> Dict[int, int]:
+    return dict(db.execute(
+        select(models.StudentResponse.question_id, models.StudentResponse.obtained_marks)
+        .where(
+            models.StudentResponse.assignment_id == assignment_id,
+            models.StudentResponse.student_id == student_id,
+            models.StudentResponse.obtained_marks.isnot(None),
+        )
+    ).all())
+
+
+def _apply_contribution(assignment_row, question_rows, scores: Dict[int, int], sign: int):
+    if not scores:
+        return
+    total = float(sum(scores.values()))
+    assignment_row.students_scored += sign
+    assignment_row.score_sum += sign * total
+    assignment_row.score_sq_sum += sign * total * total
+    histogram = dict(assignment_row.histogram or {})
+    key = str(int(round(total)))
+    histogram[key] = histogram.get(key, 0) + sign
+    if histogram[key] <= 0:
+        del histogram[key]
+    assignment_row.histogram = histogram
+
+    for question_id, marks in scores.items():
+        row = question_rows[question_id]
+        row.responses_scored += sign
+        row.score_sum += sign * marks
+        row.score_sq_sum += sign * marks * marks
+        row.total_sum += sign * total
+        row.total_sq_sum += sign * total * total
+        row.cross_sum += sign * marks * total
+
+
+def apply_student_change(db: Session, assignment_id: int, student_id: int, old_scores: Dict[int, int]):
+    """Update the summaries after one student's marks changed.
+
+    old_scores is student_scores() from before the change; the new marks must
+    already be flushed. Caller commits.
+    """
+    lock_row = (
+        select(models.AssignmentStats)
+        .where(models.AssignmentStats.assignment_id == assignment_id)
+        .with_for_update()
+    )
+    assignment_row = db.execute(lock_row).scalar_one_or_none()
+    if assignment_row is None:
+        class_id = db.scalar(select(models.Assignment.class_id).where(models.Assignment.id == assignment_id))
+        if class_id is None:
+            return
+        db.execute(_ensure_stats_row_stmt(db, assignment_id, class_id))
+        assignment_row = db.execute(lock_row).scalar_one()
+    if assignment_row.updated_at is None:
+        # never summarized (or graded before analytics existed): rebuild it whole under the lock
+        _summarize_locked(db, assignment_row)
+        return
+
+    new_scores = student_scores(db, assignment_id, student_id)
+    if new_scores == old_scores:
+        return
+    question_ids = set(old_scores) | set(new_scores)
+    question_rows = {
+        row.question_id: row
+        for row in db.scalars(
+            select(models.QuestionStats)
+            .where(models.QuestionStats.question_id.in_(question_ids))
+            .with_for_update()
+        )
+    }
+    missing = question_ids - set(question_rows)
+    if missing:
+        for question_id, marks in db.execute(
+            select(models.AssignmentQuestion.id, models.AssignmentQuestion.marks)
+            .where(models.AssignmentQuestion.id.in_(missing))
+        ):
+            row = models.QuestionStats(question_id=question_id, assignment_id=assignment_id, max_marks=marks)
+            for column in _QUESTION_SUMS:
+                setattr(row, column, 0)
+            db.add(row)
+            question_rows[question_id] = row
+
+    _apply_contribution(assignment_row, question_rows, old_scores, -1)
+    _apply_contribution(assignment_row, question_rows, new_scores, +1)
+    assignment_row.updated_at = datetime.now()
+
+
+def _median_from_histogram(histogram: dict, count: int) -> Optional[float]:
+    if not count:
+        return None
+    ordered = sorted((int(score), n) for score, n in histogram.items())
+
+    def nth(position):
+        seen = 0
+        for score, n in ordered:
+            seen += n
+            if seen > position:
+                return score
+        return ordered[-1][0]
+
+    if count % 2:
+        return float(nth(count // 2))
+    return (nth(count // 2 - 1) + nth(count // 2)) / 2
+
+
+def assignment_summary(row: models.AssignmentStats) -> dict:
+    n = row.students_scored
+    mean = row.score_sum / n if n else None
+    variance = max(row.score_sq_sum / n - mean * mean, 0.0) if n else None
+    histogram = row.histogram or {}
+    return {
+        "assignment_id": row.assignment_id,
+        "class_id": row.class_id,
+        "students_scored": n,
+        "mean": mean,
+        "median": _median_from_histogram(histogram, n),
+        "std_dev": math.sqrt(variance) if variance is not None else None,
+        "histogram": [{"score": int(score), "students": count} for score, count in sorted(histogram.items(), key=lambda item: int(item[0]))],
+        "updated_at": row.updated_at,
+    }
+
+
+def question_summary(row: models.QuestionStats) -> dict:
+    n = row.responses_scored
+    mean = row.score_sum / n if n else None
+    discrimination = None
+    if n > 1:
+        # Pearson correlation between the question score and the student's total
+        covariance = n * row.cross_sum - row.score_sum * row.total_sum
+        spread = (n * row.score_sq_sum - row.score_sum ** 2) * (n * row.total_sq_sum - row.total_sum ** 2)
+        if spread > 0:
+            discrimination = covariance / math.sqrt(spread)
+    return {
+        "question_id": row.question_id,
+        "assignment_id": row.assignment_id,
+        "responses_scored": n,
+        "max_marks": row.max_marks,
+        "mean": mean,
+        "difficulty": mean / row.max_marks if n and row.max_marks else None,
+        "discrimination": discrimination,
+        "updated_at": row.updated_at,
+    }
@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import jwt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import get_db
+import models
+
+SECRET_KEY = os.getenv("JWT_SECRET_KEY", "THIS_IS_HOGWARTS_PORTAL")  # Replace with a strong secret key
+ALGORITHM = "HS256"  # You can use other algorithms, like RS256, if you want
+# assign-role only clears this process's cache; other workers pick the change up within the TTL
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "60"))
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "20000"))
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.now(timezone.utc) + expires_delta
+    else:
+        expire = datetime.now(timezone.utc) + timedelta(hours=24)  # Default 1-hour expiration
+    to_encode.update({"exp": expire})
+
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+
+@dataclass(frozen=True)
+class Identity:
+    user_id: int
+    role: str
+    email: Optional[str] = None
+    student_id: Optional[int] = None
+    class_id: Optional[int] = None
+    teacher_id: Optional[int] = None
+    subject: Optional[str] = None
+    department: Optional[str] = None
+
+
+class IdentityCache:
+    """user_id -> role-specific IDs, bounded by TTL and entry count."""
+
+    def __init__(self, ttl: float = IDENTITY_CACHE_TTL, max_entries: int = IDENTITY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # sync handlers run on the threadpool, so guard the dict
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id: int, claims: dict):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, claims)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+identity_cache = IdentityCache()
+
+
+def role_claims_query(user_id: int):
+    return (
+        select(
+            models.Student.id.label("student_id"),
+            models.Student.class_id,
+            models.Teacher.id.label("teacher_id"),
+            models.Teacher.subject,
+            models.Teacher.department,
+        )
+        .select_from(models.User)
+        .outerjoin(models.Student, models.Student.user_id == models.User.id)
+        .outerjoin(models.Teacher, models.Teacher.user_id == models.User.id)
+        .where(models.User.id == user_id)
+        .limit(1)
+    )
+
+
+def load_role_claims(db: Session, user_id: int) -> dict:
+    row = db.execute(role_claims_query(user_id)).first()
+    claims = {key: value for key, value in row._mapping.items() if value is not None} if row else {}
+    identity_cache.set(user_id, claims)
+    return claims
+
+
+def role_claims(db: Session, user_id: int) -> dict:
+    claims = identity_cache.get(user_id)
+    if claims is None:
+        claims = load_role_claims(db, user_id)
+    return claims
+
+
+def decode_token(token: str) -> dict:
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired", headers={"WWW-Authenticate": "Bearer"})
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def get_optional_identity(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+    db: Session = Depends(get_db),
+) -> Optional[Identity]:
+    if credentials is None:
+        return None
+    claims = decode_token(credentials.credentials)
+    user_id = claims.get("user_id")
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+
+    # Role IDs always come from the database through the TTL cache, never from
+    # the token: a token outlives role changes made by any worker or pod.
+    role_ids = role_claims(db, user_id)
+
+    return Identity(user_id=user_id, role=claims.get("role"), email=claims.get("sub"), **role_ids)
+
+
+def get_current_identity(identity: Optional[Identity] = Depends(get_optional_identity)) -> Identity:
+    if identity is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return identity
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+CHAT_SESSION_IDLE_TTL = float(os.getenv("CHAT_SESSION_IDLE_TTL", "1800"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "5000"))
+CHAT_MAX_TURNS = int(os.getenv("CHAT_MAX_TURNS", "12"))
+CHAT_MAX_HISTORY_TOKENS = int(os.getenv("CHAT_MAX_HISTORY_TOKENS", "3000"))
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "1200"))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English prompts
+    return len(text) // 4 + 1
+
+
+class ChatSession:
+    def __init__(self, session_id: str, role: str):
+        self.session_id = session_id
+        self.role = role
+        self.turns = deque()  # (user_message, model_reply)
+        self.summary_lines = deque()
+        self.tokens = 0
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def contents(self, message: str) -> list:
+        contents = []
+        if self.summary_lines:
+            summary = "Summary of our earlier conversation:\n" + "\n".join(self.summary_lines)
+            contents.append({"role": "user", "parts": [summary]})
+            contents.append({"role": "model", "parts": ["Understood, I will keep that context in mind."]})
+        for user_message, reply in self.turns:
+            contents.append({"role": "user", "parts": [user_message]})
+            contents.append({"role": "model", "parts": [reply]})
+        contents.append({"role": "user", "parts": [message]})
+        return contents
+
+    def record(self, message: str, reply: str):
+        self.turns.append((message, reply))
+        self.tokens += estimate_tokens(message) + estimate_tokens(reply)
+        while self.turns and (len(self.turns) > CHAT_MAX_TURNS or self.tokens > CHAT_MAX_HISTORY_TOKENS):
+            self._fold_oldest_turn()
+
+    def _fold_oldest_turn(self):
+        # Older turns are reduced to a one-line note of what was asked, so
+        # the prompt stays bounded without an extra model call to summarize.
+        message, reply = self.turns.popleft()
+        self.tokens -= estimate_tokens(message) + estimate_tokens(reply)
+        self.summary_lines.append(f"- The user asked: {' '.join(message.split())[:160]}")
+        while sum(len(line) for line in self.summary_lines) > CHAT_SUMMARY_MAX_CHARS:
+            self.summary_lines.popleft()
+
+
+class ChatSessionStore:
+    def __init__(self, idle_ttl: float = CHAT_SESSION_IDLE_TTL, max_sessions: int = CHAT_MAX_SESSIONS):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # least recently used first
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used + self.idle_ttl > now and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def get(self, session_id: str, role: str) -> ChatSession:
+        session = self._sessions.get(session_id)
+        if session is None or session.role != role or session.last_used + self.idle_ttl <= time.monotonic():
+            session = ChatSession(session_id, role)
+            self._sessions[session_id] = session
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        self._evict()
+        return session
+
+    def peek(self, session_id: str) -> Optional[ChatSession]:
+        return self._sessions.get(session_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+chat_sessions = ChatSessionStore()
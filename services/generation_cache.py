@@ -0,0 +1,144 @@
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", "3600"))
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "1024"))
+GENERATION_CACHE_MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize_text(value) -> str:
+    if value is None:
+        return ""
+    return _WHITESPACE_RE.sub(" ", str(value)).strip()
+
+
+def normalize_question_request(question_type, count, topic, grade, description):
+    # Any type the prompt builders don't special-case falls back to descriptive.
+    question_type = question_type if question_type in ("mcq", "prob") else "description"
+    try:
+        count = int(count)
+    except (TypeError, ValueError):
+        count = None
+    return question_type, count, _normalize_text(topic), _normalize_text(grade), _normalize_text(description)
+
+
+def question_cache_key(question_type, count, topic, grade, description) -> tuple:
+    question_type, count, topic, grade, description = normalize_question_request(
+        question_type, count, topic, grade, description
+    )
+    return question_type, count, topic.lower(), grade.lower(), description.lower()
+
+
+class GenerationCache:
+    """TTL + LRU cache for model output with single-flight de-duplication."""
+
+    def __init__(
+        self,
+        ttl: float = GENERATION_CACHE_TTL,
+        max_entries: int = GENERATION_CACHE_MAX_ENTRIES,
+        max_bytes: int = GENERATION_CACHE_MAX_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, value, size)
+        self._inflight = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _size(key, value: str) -> int:
+        return len(repr(key)) + len(value.encode("utf-8"))
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value: str):
+        size = self._size(key, value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    async def get_or_create(self, key, factory: Callable[[], Awaitable[str]]) -> str:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # an identical request is already waiting on the model: share its result
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        # the model call runs as its own task: a caller that gets cancelled (a
+        # teacher closing the tab) stops waiting without cancelling the call
+        # for everyone coalesced onto it
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        # retrieving the exception also keeps an unshared failure from
+        # logging "exception was never retrieved"
+        if task.exception() is None:
+            self.set(key, task.result())
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+question_cache = GenerationCache()
@@ -0,0 +1,355 @@
+import asyncio
+import json
+import os
+from typing import Callable, Optional
+from sqlalchemy import select, update, case, func
+from sqlalchemy.orm import Session
+from services.ai_service import generate_from_prompt
+from services.analytics import apply_student_change, recompute_assignments, student_scores
+from services.chat_sessions import estimate_tokens
+from services.structured_output import strip_code_fences
+from utils.prompt_template import batch_correction_prompt, correction_prompt
+import models
+
+GRADING_CONCURRENCY = int(os.getenv("GRADING_CONCURRENCY", "8"))
+GRADING_BATCH_SIZE = int(os.getenv("GRADING_BATCH_SIZE", "50"))
+# Answers to the same question are graded several per prompt, packed until
+# either the prompt or the expected reply would outgrow its token budget.
+GRADING_PROMPT_TOKEN_BUDGET = int(os.getenv("GRADING_PROMPT_TOKEN_BUDGET", "6000"))
+GRADING_OUTPUT_TOKEN_BUDGET = int(os.getenv("GRADING_OUTPUT_TOKEN_BUDGET", "2000"))
+GRADING_OUTPUT_TOKENS_PER_ANSWER = int(os.getenv("GRADING_OUTPUT_TOKENS_PER_ANSWER", "60"))
+GRADING_MAX_ANSWERS_PER_PROMPT = int(os.getenv("GRADING_MAX_ANSWERS_PER_PROMPT", "40"))
+
+def parse_score(raw_text: str, max_marks: int):
+    text = strip_code_fences(raw_text)
+    result = json.loads(text)
+    score = int(result.get("score", 0))
+    # never trust the model to stay inside the question's mark range
+    score = max(0, min(score, max_marks))
+    return score, result.get("feedback", "")
+
+
+def parse_batch_scores(raw_text: str, expected_ids, max_marks: int):
+    """Return ({id: (score, feedback)}, ids that were missing or invalid)."""
+    expected = set(expected_ids)
+    try:
+        items = json.loads(strip_code_fences(raw_text))
+    except ValueError:
+        return {}, expected
+    if isinstance(items, dict):
+        items = items.get("scores") or items.get("results") or [items]
+    if not isinstance(items, list):
+        return {}, expected
+
+    scores = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            answer_id, score = int(item.get("id")), int(item.get("score"))
+        except (TypeError, ValueError):
+            continue
+        # unlike single grading, an out-of-range score is re-asked rather than clamped
+        if answer_id in expected and answer_id not in scores and 0 <= score <= max_marks:
+            scores[answer_id] = (score, str(item.get("feedback", "")))
+    return scores, expected - set(scores)
+
+
+def plan_batches(rows, prompt_budget: int = GRADING_PROMPT_TOKEN_BUDGET, output_budget: int = GRADING_OUTPUT_TOKEN_BUDGET,
+                 max_answers: int = GRADING_MAX_ANSWERS_PER_PROMPT):
+    """Split answers to one question into prompt-sized batches."""
+    if not rows:
+        return []
+    overhead = estimate_tokens(batch_correction_prompt(rows[0].question_text, rows[0].marks, []))
+    max_answers = max(1, min(max_answers, output_budget // GRADING_OUTPUT_TOKENS_PER_ANSWER))
+    batches, batch, used = [], [], overhead
+    for row in rows:
+        cost = estimate_tokens(row.response) + 8  # answer tags and id
+        if batch and (used + cost > prompt_budget or len(batch) >= max_answers):
+            batches.append(batch)
+            batch, used = [], overhead
+        batch.append(row)
+        used += cost
+    batches.append(batch)
+    return batches
+
+
+def grade_mcq_responses(db: Session, assignment_id: int) -> int:
+    # One UPDATE for the whole assignment: the answer key is read through
+    # correlated subqueries instead of loading every row into Python.
+    correct_answer = (
+        select(models.AssignmentQuestion.correct_answer)
+        .where(models.AssignmentQuestion.id == models.StudentResponse.question_id)
+        .scalar_subquery()
+    )
+    marks = (
+        select(models.AssignmentQuestion.marks)
+        .where(models.AssignmentQuestion.id == models.StudentResponse.question_id)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(models.StudentResponse)
+        .where(
+            models.StudentResponse.assignment_id == assignment_id,
+            models.StudentResponse.obtained_marks.is_(None),
+        )
+        .values(
+            obtained_marks=case(
+                (func.lower(func.trim(models.StudentResponse.response)) == func.lower(func.trim(correct_answer)), marks),
+                else_=0,
+            ),
+            reviewed_by_ai=True,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).rowcount
+
+
+def ungraded_descriptive_query(assignment_id: int):
+    return (
+        select(
+            models.StudentResponse.id,
+            models.StudentResponse.student_id,
+            models.StudentResponse.question_id,
+            models.StudentResponse.response,
+            models.AssignmentQuestion.question_text,
+            models.AssignmentQuestion.marks,
+        )
+        .join(models.AssignmentQuestion, models.AssignmentQuestion.id == models.StudentResponse.question_id)
+        .where(
+            models.StudentResponse.assignment_id == assignment_id,
+            models.StudentResponse.obtained_marks.is_(None),
+        )
+        .order_by(models.StudentResponse.id)
+    )
+
+
+async def _grade_row(row, semaphore: asyncio.Semaphore):
+    if not row.response or not row.response.strip():
+        return row, 0, "No answer submitted"
+    prompt = correction_prompt(question=row.question_text, answer=row.response, marks=row.marks)
+    async with semaphore:
+        raw_output = await generate_from_prompt(prompt)
+    score, feedback = parse_score(raw_output, row.marks)
+    return row, score, feedback
+
+
+def _fetch_ungraded(db: Session, assignment_id: int) -> list:
+    rows = db.execute(ungraded_descriptive_query(assignment_id)).all()
+    # grading takes a while; give the connection back to the pool until the first flush
+    db.rollback()
+    return rows
+
+
+def _flush_grades(db: Session, pending: list):
+    if not pending:
+        return
+    db.execute(update(models.StudentResponse), pending)
+    db.commit()
+    pending.clear()
+
+
+async def _grade_batch(batch, semaphore: asyncio.Semaphore):
+    if len(batch) == 1:
+        return [await _guarded_row(batch[0], semaphore)], 1
+    first = batch[0]
+    prompt = batch_correction_prompt(first.question_text, first.marks, [(row.id, row.response) for row in batch])
+    calls = 1
+    try:
+        async with semaphore:
+            raw_output = await generate_from_prompt(prompt)
+        scores, retry_ids = parse_batch_scores(raw_output, [row.id for row in batch], first.marks)
+    except Exception as e:
+        print(f"Batched grading failed for {len(batch)} responses: {str(e)}")
+        scores, retry_ids = {}, {row.id for row in batch}
+
+    graded = [(row, *scores[row.id]) for row in batch if row.id in scores]
+    # only the answers the batch reply left out (or scored badly) cost an extra call each
+    retries = [row for row in batch if row.id in retry_ids]
+    graded.extend(await asyncio.gather(*(_guarded_row(row, semaphore) for row in retries)))
+    return graded, calls + len(retries)
+
+
+async def _guarded_row(row, semaphore: asyncio.Semaphore):
+    try:
+        return await _grade_row(row, semaphore)
+    except Exception as e:
+        return row, None, str(e)
+
+
+async def grade_descriptive_responses(
+    db: Session,
+    assignment_id: int,
+    concurrency: int = GRADING_CONCURRENCY,
+    batch_size: int = GRADING_BATCH_SIZE,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+):
+    rows = await asyncio.to_thread(_fetch_ungraded, db, assignment_id)
+    if on_progress:
+        await asyncio.to_thread(on_progress, 0, len(rows))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    blank = [row for row in rows if not row.response or not row.response.strip()]
+    by_question = {}
+    for row in rows:
+        if row.response and row.response.strip():
+            by_question.setdefault(row.question_id, []).append(row)
+    batches = [batch for question_rows in by_question.values() for batch in plan_batches(question_rows)]
+
+    results, failures, pending = [], [], []
+    llm_calls = 0
+
+    def record(row, score, feedback):
+        if score is None:
+            print(f"AI grading failed for response {row.id}: {feedback}")
+            failures.append({"id": row.id, "student_id": row.student_id, "error": feedback})
+            return
+        pending.append({"id": row.id, "obtained_marks": score, "reviewed_by_ai": True})
+        results.append({
+            "id": row.id,
+            "student_id": row.student_id,
+            "question_id": row.question_id,
+            "obtained_marks": score,
+            "feedback": feedback,
+        })
+
+    for row in blank:
+        record(row, 0, "No answer submitted")
+    for next_done in asyncio.as_completed([_grade_batch(batch, semaphore) for batch in batches]):
+        graded, calls = await next_done
+        llm_calls += calls
+        for row, score, feedback in graded:
+            record(row, score, feedback)
+        if len(pending) >= batch_size:
+            await asyncio.to_thread(_flush_grades, db, pending)
+            if on_progress:
+                await asyncio.to_thread(on_progress, len(results) + len(failures), len(rows))
+    await asyncio.to_thread(_flush_grades, db, pending)
+    if on_progress:
+        await asyncio.to_thread(on_progress, len(results) + len(failures), len(rows))
+
+    return {
+        "total": len(rows),
+        "graded": len(results),
+        "failed": len(failures),
+        "llm_calls": llm_calls,
+        "results": results,
+        "failures": failures,
+    }
+
+
+def submission_grading_query(submission_id: int):
+    return (
+        select(
+            models.StudentResponse.id,
+            models.StudentResponse.response,
+            models.AssignmentQuestion.question_text,
+            models.AssignmentQuestion.correct_answer,
+            models.AssignmentQuestion.marks,
+            models.Assignment.assignment_type,
+        )
+        .outerjoin(models.AssignmentQuestion, models.AssignmentQuestion.id == models.StudentResponse.question_id)
+        .outerjoin(models.Assignment, models.Assignment.id == models.StudentResponse.assignment_id)
+        .where(models.StudentResponse.id == submission_id)
+    )
+
+
+def _load_submission(db: Session, submission_id: int) -> dict:
+    row = db.execute(submission_grading_query(submission_id)).first()
+    # nothing is written until the model replies; don't hold the connection meanwhile
+    db.rollback()
+    if row is None:
+        raise LookupError("Submission not found")
+    if row.question_text is None or row.assignment_type is None:
+        raise LookupError("Assignment or Question not found")
+    return row._asdict()
+
+
+def _save_submission_grade(db: Session, target: dict, obtained_marks: Optional[int], reviewed_by_ai: bool) -> dict:
+    submission = db.get(models.StudentResponse, target["id"])
+    if submission is None:
+        raise LookupError("Submission not found")
+    old_scores = student_scores(db, submission.assignment_id, submission.student_id)
+    submission.obtained_marks = obtained_marks
+    submission.reviewed_by_ai = reviewed_by_ai
+    db.flush()
+    apply_student_change(db, submission.assignment_id, submission.student_id, old_scores)
+    db.commit()
+    db.refresh(submission)
+
+    return {
+        "id": submission.id,
+        "question_text": target["question_text"],
+        "response": submission.response,
+        "obtained_marks": submission.obtained_marks,
+        "reviewed_by_ai": submission.reviewed_by_ai,
+        "student_id": submission.student_id,
+        "assignment_type": target["assignment_type"].value
+    }
+
+
+async def grade_submission(db: Session, submission_id: int) -> dict:
+    # the session is only used from worker threads, one step at a time; only the model call runs on the loop
+    target = await asyncio.to_thread(_load_submission, db, submission_id)
+    assignment_type = target["assignment_type"]
+
+    if assignment_type == models.AssignmentType.mcq:
+        is_correct = target["response"].strip().lower() == target["correct_answer"].strip().lower()
+        obtained_marks, reviewed_by_ai = (target["marks"] if is_correct else 0), True
+
+    elif assignment_type == models.AssignmentType.description:
+        prompt = correction_prompt(question=target["question_text"], answer=target["response"], marks=target["marks"])
+        response = await generate_from_prompt(prompt)
+        try:
+            score, _ = parse_score(response, target["marks"])
+        except Exception as e:
+            raise ValueError(f"AI response parsing failed: {str(e)}")
+        obtained_marks, reviewed_by_ai = score, True
+
+    else:
+        # file and prob submissions are reviewed by hand
+        obtained_marks, reviewed_by_ai = None, False
+
+    return await asyncio.to_thread(_save_submission_grade, db, target, obtained_marks, reviewed_by_ai)
+
+
+def _assignment_type(db: Session, assignment_id: int) -> models.AssignmentType:
+    assignment_type = db.scalar(select(models.Assignment.assignment_type).where(models.Assignment.id == assignment_id))
+    db.rollback()
+    if assignment_type is None:
+        raise LookupError("Assignment not found")
+    return assignment_type
+
+
+def _grade_mcq_and_commit(db: Session, assignment_id: int) -> int:
+    graded = grade_mcq_responses(db, assignment_id)
+    db.commit()
+    return graded
+
+
+def _recompute_and_commit(db: Session, assignment_id: int):
+    recompute_assignments(db, [assignment_id])
+    db.commit()
+
+
+async def grade_assignment(db: Session, assignment_id: int, on_progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    # on_progress may write to the database, so it is called from a worker thread too
+    assignment_type = await asyncio.to_thread(_assignment_type, db, assignment_id)
+
+    if assignment_type == models.AssignmentType.mcq:
+        graded = await asyncio.to_thread(_grade_mcq_and_commit, db, assignment_id)
+        report = {"total": graded, "graded": graded, "failed": 0, "results": [], "failures": []}
+        if on_progress:
+            await asyncio.to_thread(on_progress, graded, graded)
+
+    elif assignment_type == models.AssignmentType.description:
+        report = await grade_descriptive_responses(db, assignment_id, on_progress=on_progress)
+
+    else:
+        # file and prob submissions stay with the teacher for manual review
+        report = {"total": 0, "graded": 0, "failed": 0, "results": [], "failures": []}
+
+    if report["graded"]:
+        await asyncio.to_thread(_recompute_and_commit, db, assignment_id)
+
+    return {"assignment_id": assignment_id, "assignment_type": assignment_type.value, **report}
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import random
+import socket
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from services.grading import grade_assignment, grade_submission
+import models
+
+GRADING_JOB_MAX_ATTEMPTS = int(os.getenv("GRADING_JOB_MAX_ATTEMPTS", "5"))
+GRADING_JOB_BACKOFF_BASE = float(os.getenv("GRADING_JOB_BACKOFF_BASE", "10"))
+GRADING_JOB_BACKOFF_CAP = float(os.getenv("GRADING_JOB_BACKOFF_CAP", "900"))
+# a running job whose worker hasn't heartbeated for this long is handed to another worker
+GRADING_JOB_LEASE = float(os.getenv("GRADING_JOB_LEASE", "600"))
+GRADING_WORKER_POLL_INTERVAL = float(os.getenv("GRADING_WORKER_POLL_INTERVAL", "2"))
+GRADING_WORKERS = int(os.getenv("GRADING_WORKERS", "2"))
+
+JOB_KINDS = ("submission", "assignment")
+_ACTIVE = (models.GradingJobStatus.queued, models.GradingJobStatus.running)
+
+
+def enqueue(db: Session, kind: str, target_id: int, max_attempts: int = GRADING_JOB_MAX_ATTEMPTS) -> models.GradingJob:
+    """Queue a grading job, reusing one that is already queued or running for the same target."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(JOB_KINDS)}")
+    job = db.execute(
+        select(models.GradingJob)
+        .where(models.GradingJob.kind == kind, models.GradingJob.target_id == target_id,
+               models.GradingJob.status.in_(_ACTIVE))
+        .order_by(models.GradingJob.id)
+        .limit(1)
+    ).scalar_one_or_none()
+    if job is None:
+        job = models.GradingJob(kind=kind, target_id=target_id, max_attempts=max_attempts,
+                                status=models.GradingJobStatus.queued, run_after=datetime.now())
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+    return job
+
+
+def job_status(job: models.GradingJob) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "target_id": job.target_id,
+        "status": job.status.value,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "progress": {"done": job.progress_done, "total": job.progress_total},
+        "run_after": job.run_after,
+        "result": job.result,
+        "last_error": job.last_error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _supports_skip_locked(db: Session) -> bool:
+    return db.get_bind().dialect.name in ("postgresql", "mysql")
+
+
+def requeue_stale(db: Session) -> int:
+    # jobs left 'running' by a worker that died mid-job go back in the queue
+    cutoff = datetime.now() - timedelta(seconds=GRADING_JOB_LEASE)
+    count = db.execute(
+        update(models.GradingJob)
+        .where(models.GradingJob.status == models.GradingJobStatus.running,
+               models.GradingJob.locked_at < cutoff)
+        .values(status=models.GradingJobStatus.queued, locked_by=None, locked_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return count
+
+
+def due_job_query(now: datetime):
+    return (
+        select(models.GradingJob.id)
+        .where(models.GradingJob.status == models.GradingJobStatus.queued, models.GradingJob.run_after <= now)
+        .order_by(models.GradingJob.run_after, models.GradingJob.id)
+        .limit(1)
+    )
+
+
+def claim_job(db: Session, worker_id: str) -> Optional[models.GradingJob]:
+    now = datetime.now()
+    due = due_job_query(now)
+    claimed = {
+        "status": models.GradingJobStatus.running,
+        "locked_by": worker_id,
+        "locked_at": now,
+        "attempts": models.GradingJob.attempts + 1,
+    }
+
+    if _supports_skip_locked(db):
+        # row lock held until commit; other workers skip it instead of waiting
+        job_id = db.execute(due.with_for_update(skip_locked=True)).scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+        db.execute(update(models.GradingJob).where(models.GradingJob.id == job_id).values(**claimed))
+        db.commit()
+        return db.get(models.GradingJob, job_id)
+
+    # SQLite has no row locks: claim with a compare-and-set UPDATE and try the
+    # next candidate if another worker got there first.
+    for _ in range(5):
+        job_id = db.execute(due).scalar()
+        if job_id is None:
+            return None
+        won = db.execute(
+            update(models.GradingJob)
+            .where(models.GradingJob.id == job_id, models.GradingJob.status == models.GradingJobStatus.queued)
+            .values(**claimed)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if won:
+            return db.get(models.GradingJob, job_id)
+    return None
+
+
+def backoff_delay(attempts: int) -> float:
+    return random.uniform(0, min(GRADING_JOB_BACKOFF_CAP, GRADING_JOB_BACKOFF_BASE * 2 ** (attempts - 1)))
+
+
+def _finish(db: Session, job_id: int, **values):
+    db.rollback()
+    db.execute(update(models.GradingJob).where(models.GradingJob.id == job_id).values(locked_by=None, locked_at=None, **values))
+    db.commit()
+
+
+async def run_job(db: Session, job: models.GradingJob):
+    # plain values: the grading code commits and rolls back this session
+    job_id, kind, target_id, attempts, max_attempts = job.id, job.kind, job.target_id, job.attempts, job.max_attempts
+
+    # called from a worker thread by the grading code
+    def on_progress(done: int, total: int):
+        db.execute(
+            update(models.GradingJob)
+            .where(models.GradingJob.id == job_id)
+            .values(progress_done=done, progress_total=total, locked_at=datetime.now())
+        )
+        db.commit()
+
+    try:
+        if kind == "submission":
+            result = await grade_submission(db, target_id)
+            await asyncio.to_thread(on_progress, 1, 1)
+        else:
+            result = await grade_assignment(db, target_id, on_progress=on_progress)
+            # rows that failed stay ungraded, so a retry only re-sends those
+            if result["failed"]:
+                raise RuntimeError(f"{result['failed']} of {result['total']} responses failed to grade")
+    except LookupError as e:
+        # the submission or assignment is gone; retrying won't help
+        await asyncio.to_thread(_finish, db, job_id, status=models.GradingJobStatus.dead, last_error=str(e), finished_at=datetime.now())
+        return
+    except Exception as e:
+        print(f"Grading job {job_id} attempt {attempts} failed: {str(e)}")
+        if attempts >= max_attempts:
+            await asyncio.to_thread(_finish, db, job_id, status=models.GradingJobStatus.dead, last_error=str(e),
+                                    finished_at=datetime.now())
+        else:
+            await asyncio.to_thread(_finish, db, job_id, status=models.GradingJobStatus.queued, last_error=str(e),
+                                    run_after=datetime.now() + timedelta(seconds=backoff_delay(attempts)))
+        return
+
+    if kind == "assignment":
+        result = {key: result[key] for key in ("assignment_id", "assignment_type", "total", "graded", "failed", "llm_calls") if key in result}
+    await asyncio.to_thread(_finish, db, job_id, status=models.GradingJobStatus.succeeded, result=result, last_error=None,
+                            finished_at=datetime.now())
+
+
+def retry_dead_job(db: Session, job: models.GradingJob) -> models.GradingJob:
+    job.status = models.GradingJobStatus.queued
+    job.attempts = 0
+    job.run_after = datetime.now()
+    job.finished_at = None
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+async def worker_loop(worker_id: str, stop: asyncio.Event, poll_interval: float = GRADING_WORKER_POLL_INTERVAL):
+    while not stop.is_set():
+        # every database step runs in a worker thread so the loop stays free for the model calls
+        db = SessionLocal()
+        try:
+            job = await asyncio.to_thread(claim_job, db, worker_id)
+            if job is not None:
+                await run_job(db, job)
+                continue
+            await asyncio.to_thread(requeue_stale, db)
+        except Exception as e:
+            print(f"Grading worker {worker_id} error: {str(e)}")
+        finally:
+            await asyncio.to_thread(db.close)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_workers(workers: int = GRADING_WORKERS, stop: Optional[asyncio.Event] = None):
+    stop = stop or asyncio.Event()
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    await asyncio.gather(*(worker_loop(f"{prefix}:{n}", stop) for n in range(workers)))
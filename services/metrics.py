@@ -0,0 +1,255 @@
+import contextvars
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# adds a Server-Timing header (app, db and llm time, query count) to every response
+METRICS_TIMING_HEADER = os.getenv("METRICS_TIMING_HEADER", "0") == "1"
+# more queries than this in one request is almost always an N+1
+METRICS_QUERY_BUDGET = int(os.getenv("METRICS_QUERY_BUDGET", "25"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.series: Dict[Tuple, list] = {}  # labels -> [per-bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, ([*counts], total, count)) for labels, (counts, total, count) in self.series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = _labels(self.label_names, labels, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        # Prometheus text exposition format 0.0.4
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body.",
+    ("method", "route", "status"))
+http_request_queries = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("route",), QUERY_COUNT_BUCKETS)
+http_request_db_seconds = registry.histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request.", ("route",))
+http_request_llm_seconds = registry.histogram(
+    "http_request_llm_seconds", "Time spent waiting on the model per request.", ("route",), LLM_BUCKETS)
+query_budget_exceeded = registry.counter(
+    "http_request_query_budget_exceeded_total", "Requests that ran more SQL statements than METRICS_QUERY_BUDGET.",
+    ("route",))
+db_query_seconds = registry.histogram(
+    "db_query_duration_seconds", "Duration of individual SQL statements.", ("operation",))
+llm_call_seconds = registry.histogram(
+    "llm_call_duration_seconds", "One model call attempt, including the wait for a concurrency slot.",
+    ("operation", "outcome"), LLM_BUCKETS)
+llm_first_chunk_seconds = registry.histogram(
+    "llm_stream_first_chunk_seconds", "Time until a streamed model call yields its first chunk.", (), LLM_BUCKETS)
+llm_tokens = registry.counter(
+    "llm_tokens_total", "Tokens reported by the model backend.", ("operation", "kind"))
+llm_errors = registry.counter(
+    "llm_errors_total", "Failed model call attempts, including ones that were retried.", ("operation", "status"))
+chat_replies = registry.counter(
+    "chat_replies_total", "Chat replies by endpoint and where the answer came from.", ("endpoint", "source"))
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+
+
+# set per request by MetricsMiddleware; threadpool endpoints and dependencies
+# run in a copy of the request's context, so they update the same object
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    db_query_seconds.observe(elapsed, (statement.split(None, 1) or ["OTHER"])[0][:10].upper())
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute doesn't fire for failed statements
+    started = exception_context.connection.info.get("query_started") if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_sqlalchemy():
+    # listening on the Engine class covers the primary and every replica engine
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+def record_llm_call(operation: str, seconds: float, error_status: Optional[str] = None,
+                    prompt_tokens: int = 0, output_tokens: int = 0):
+    llm_call_seconds.observe(seconds, operation, "error" if error_status else "ok")
+    if error_status:
+        llm_errors.inc(operation, error_status)
+    if prompt_tokens:
+        llm_tokens.inc(operation, "prompt", amount=prompt_tokens)
+    if output_tokens:
+        llm_tokens.inc(operation, "output", amount=output_tokens)
+    stats = _current.get()
+    if stats is not None:
+        stats.llm_calls += 1
+        stats.llm_seconds += seconds
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    # unmatched paths share one label so scanners can't blow up the series count
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+def _server_timing(stats: RequestStats, elapsed: float) -> bytes:
+    return (
+        f'app;dur={elapsed * 1000:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+        f'llm;dur={stats.llm_seconds * 1000:.1f};desc="{stats.llm_calls} calls"'
+    ).encode()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses pass through untouched."""
+
+    def __init__(self, app, timing_header: bool = METRICS_TIMING_HEADER, query_budget: int = METRICS_QUERY_BUDGET):
+        self.app = app
+        self.timing_header = timing_header
+        self.query_budget = query_budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.timing_header:
+                    # headers go out before the body, so this is time to first byte
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(stats, time.perf_counter() - started)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - started
+            route = _route_label(scope)
+            http_request_seconds.observe(elapsed, scope["method"], route, str(status))
+            http_request_queries.observe(stats.queries, route)
+            http_request_db_seconds.observe(stats.db_seconds, route)
+            if stats.llm_calls:
+                http_request_llm_seconds.observe(stats.llm_seconds, route)
+            if stats.queries > self.query_budget:
+                query_budget_exceeded.inc(route)
+                print(f"Query budget exceeded: {scope['method']} {route} ran {stats.queries} queries "
+                      f"(budget {self.query_budget}, {stats.db_seconds * 1000:.0f} ms in the database)")
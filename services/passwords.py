@@ -0,0 +1,99 @@
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+# running + queued hashes allowed before logins are turned away with a 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+# slots bulk work (roster imports) may hold at once; kept below MAX_PENDING so logins always have room
+PASSWORD_HASH_BULK_SLOTS = int(os.getenv("PASSWORD_HASH_BULK_SLOTS", str(PASSWORD_HASH_WORKERS)))
+
+# min == max == default, so any stored hash at a different work factor is
+# flagged by verify_and_update and rewritten on the user's next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class HashingOverloaded(Exception):
+    pass
+
+
+class HashingPool:
+    """Dedicated bcrypt threads with a hard cap on outstanding work."""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING,
+                 bulk_slots: int = PASSWORD_HASH_BULK_SLOTS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.bulk_slots = max(1, min(bulk_slots, max_pending - 1))
+        # bcrypt releases the GIL while hashing, so threads give real parallelism
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        # asyncio primitives belong to one event loop; keep one set per loop
+        self._waiters = weakref.WeakKeyDictionary()
+
+    def _loop_waiters(self) -> Tuple[asyncio.Semaphore, asyncio.Condition]:
+        loop = asyncio.get_running_loop()
+        waiters = self._waiters.get(loop)
+        if waiters is None:
+            waiters = self._waiters[loop] = (asyncio.Semaphore(self.bulk_slots), asyncio.Condition())
+        return waiters
+
+    def _try_admit(self) -> bool:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                return False
+            self.pending += 1
+            return True
+
+    async def run(self, fn, *args, wait: bool = False):
+        # Interactive callers fail fast; bulk callers (wait=True) queue for one
+        # of bulk_slots, so a big import never fills the queue logins need.
+        if not wait:
+            if not self._try_admit():
+                self.rejected += 1
+                raise HashingOverloaded("Password hashing queue is full")
+            return await self._execute(fn, *args)
+        bulk, freed = self._loop_waiters()
+        async with bulk:
+            async with freed:
+                await freed.wait_for(self._try_admit)
+            return await self._execute(fn, *args)
+
+    async def _execute(self, fn, *args):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+            _, freed = self._loop_waiters()
+            async with freed:
+                freed.notify()
+
+
+hashing_pool = HashingPool()
+
+
+async def hash_password(password: str) -> str:
+    return await hashing_pool.run(pwd_context.hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    # returns (valid, replacement hash when the stored one uses an old work factor)
+    return await hashing_pool.run(pwd_context.verify_and_update, password, hashed_password)
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    return await asyncio.gather(*(hashing_pool.run(pwd_context.hash, p, wait=True) for p in passwords))
@@ -0,0 +1,222 @@
+import hashlib
+import os
+import re
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+import models
+
+BANK_MINHASH_PERMUTATIONS = 64
+BANK_LSH_BANDS = 16  # 16 bands x 4 rows: pairs above ~0.7 Jaccard nearly always share a band
+BANK_DUPLICATE_THRESHOLD = float(os.getenv("BANK_DUPLICATE_THRESHOLD", "0.8"))
+BANK_SHINGLE_SIZE = 3
+BANK_TOPIC_WEIGHT = 3  # topic words outrank words that only appear in the question text
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)  # fixed so stored signatures stay comparable
+_HASH_A = _rng.integers(1, _PRIME, size=BANK_MINHASH_PERMUTATIONS, dtype=np.int64)
+_HASH_B = _rng.integers(0, _PRIME, size=BANK_MINHASH_PERMUTATIONS, dtype=np.int64)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_DIGITS_RE = re.compile(r"\d+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or that the this to was what when where which who why with "
+    "class grade chapter topic".split()
+)
+BANK_TYPES = ("mcq", "description", "prob")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    words = []
+    for word in _WORD_RE.findall((text or "").lower()):
+        if word in _STOPWORDS:
+            continue
+        # crude plural folding so "plants" finds "plant"
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word[:50])
+    return words
+
+
+def normalize_grade(grade) -> str:
+    # "7", "Grade 7" and "class 7" all land in the same bucket
+    text = str(grade or "").strip().lower()
+    digits = _DIGITS_RE.search(text)
+    return digits.group(0) if digits else text[:20]
+
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=4).digest(), "little") & _PRIME
+
+
+def minhash(text: str) -> List[int]:
+    words = tokenize(text)
+    if len(words) < BANK_SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + BANK_SHINGLE_SIZE]) for i in range(len(words) - BANK_SHINGLE_SIZE + 1)}
+    values = np.array([_stable_hash(s) for s in shingles], dtype=np.int64)
+    # (a*x + b) mod p stays below 2**62, so int64 never overflows
+    signature = (_HASH_A[:, None] * values[None, :] + _HASH_B[:, None]) % _PRIME
+    return signature.min(axis=1).tolist()
+
+
+def similarity(signature_a, signature_b) -> float:
+    return float(np.mean(np.asarray(signature_a) == np.asarray(signature_b)))
+
+
+def lsh_bands(signature: List[int]) -> List[str]:
+    rows = len(signature) // BANK_LSH_BANDS
+    bands = []
+    for band in range(BANK_LSH_BANDS):
+        chunk = ",".join(str(v) for v in signature[band * rows:(band + 1) * rows])
+        bands.append(f"{band:02d}:{hashlib.blake2b(chunk.encode(), digest_size=8).hexdigest()}")
+    return bands
+
+
+def text_hash(question_type: str, grade: str, question_text: str) -> str:
+    canonical = " ".join(_WORD_RE.findall(question_text.lower()))
+    return hashlib.sha256(f"{question_type}|{grade}|{canonical}".encode()).hexdigest()
+
+
+def near_duplicate_query(question_type: str, grade: str, signature: List[int]):
+    return (
+        select(models.BankQuestion.id, models.BankQuestion.minhash)
+        .join(models.BankQuestionBand, models.BankQuestionBand.question_id == models.BankQuestion.id)
+        .where(
+            models.BankQuestionBand.band.in_(lsh_bands(signature)),
+            models.BankQuestion.question_type == question_type,
+            models.BankQuestion.grade == grade,
+        )
+        .distinct()
+    )
+
+
+def find_near_duplicate(db: Session, question_type: str, grade: str, signature: List[int]) -> Optional[int]:
+    candidates = db.execute(near_duplicate_query(question_type, grade, signature)).all()
+    for question_id, stored in candidates:
+        if similarity(signature, stored) >= BANK_DUPLICATE_THRESHOLD:
+            return question_id
+    return None
+
+
+def index_questions(db: Session, question_type: str, subject: Optional[str], topic: str, grades: List[str], questions: List[dict]) -> dict:
+    """Add published questions to the bank, skipping exact and near duplicates. Caller commits."""
+    report = {"added": 0, "duplicates": 0}
+    if question_type not in BANK_TYPES or not topic:
+        return report
+    topic_terms = set(tokenize(topic))
+    for grade in dict.fromkeys(normalize_grade(g) for g in grades):
+        for q in questions:
+            question_text = (q.get("question_text") or "").strip()
+            if not question_text:
+                continue
+            digest = text_hash(question_type, grade, question_text)
+            signature = minhash(question_text)
+            exists = db.execute(select(models.BankQuestion.id).where(models.BankQuestion.text_hash == digest)).first()
+            if exists or find_near_duplicate(db, question_type, grade, signature):
+                report["duplicates"] += 1
+                continue
+            row = models.BankQuestion(
+                question_type=question_type,
+                subject=(subject or "").strip().lower()[:100] or None,
+                topic=topic.strip().lower()[:255],
+                grade=grade,
+                question_text=question_text,
+                options=q.get("options"),
+                correct_answer=q.get("correct_answer"),
+                marks=q.get("marks") or 1,
+                text_hash=digest,
+                minhash=signature,
+                times_served=0,
+            )
+            db.add(row)
+            db.flush()
+            weights: Dict[str, int] = {}
+            for term in tokenize(question_text):
+                weights[term] = 1
+            for term in topic_terms:
+                weights[term] = BANK_TOPIC_WEIGHT
+            db.execute(insert(models.BankQuestionTerm), [
+                {"term": term, "question_id": row.id, "weight": weight} for term, weight in weights.items()
+            ])
+            db.execute(insert(models.BankQuestionBand), [
+                {"band": band, "question_id": row.id} for band in dict.fromkeys(lsh_bands(signature))
+            ])
+            report["added"] += 1
+    return report
+
+
+def bank_search_query(question_type: str, topic: str, grade, limit: int, subject: Optional[str] = None):
+    terms = list(dict.fromkeys(tokenize(topic)))
+    if not terms:
+        return None
+    # every topic word has to match, in the topic or the question itself
+    matches = (
+        select(
+            models.BankQuestionTerm.question_id,
+            func.sum(models.BankQuestionTerm.weight).label("score"),
+        )
+        .where(models.BankQuestionTerm.term.in_(terms))
+        .group_by(models.BankQuestionTerm.question_id)
+        .having(func.count(models.BankQuestionTerm.term) == len(terms))
+        .subquery()
+    )
+    stmt = (
+        select(models.BankQuestion)
+        .join(matches, matches.c.question_id == models.BankQuestion.id)
+        .where(models.BankQuestion.question_type == question_type, models.BankQuestion.grade == normalize_grade(grade))
+        # best match first, then least served so repeat requests rotate through the bank
+        .order_by(matches.c.score.desc(), models.BankQuestion.times_served, models.BankQuestion.id)
+        .limit(limit)
+    )
+    if subject:
+        stmt = stmt.where(models.BankQuestion.subject == subject.strip().lower())
+    return stmt
+
+
+def take_from_bank(db: Session, question_type: str, topic: str, grade, count: int, subject: Optional[str] = None) -> List[models.BankQuestion]:
+    stmt = bank_search_query(question_type, topic, grade, count, subject)
+    if stmt is None or count <= 0:
+        return []
+    rows = list(db.scalars(stmt))
+    if rows:
+        db.execute(
+            update(models.BankQuestion)
+            .where(models.BankQuestion.id.in_([row.id for row in rows]))
+            .values(times_served=models.BankQuestion.times_served + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    return rows
+
+
+def as_generated(row: models.BankQuestion) -> dict:
+    # same keys the generation prompts ask the model for
+    item = {"question": row.question_text, "marks": row.marks}
+    if row.options is not None:
+        item["options"] = row.options
+    if row.correct_answer is not None:
+        item["answer"] = row.correct_answer
+    return item
+
+
+class DuplicateFilter:
+    """Admits a question only if it isn't a near duplicate of one already admitted."""
+
+    def __init__(self, served: List[models.BankQuestion] = ()):
+        self.signatures = [row.minhash for row in served]
+
+    def admit(self, question_text: str) -> bool:
+        signature = minhash(question_text)
+        if any(similarity(signature, other) >= BANK_DUPLICATE_THRESHOLD for other in self.signatures):
+            return False
+        self.signatures.append(signature)
+        return True
+
+
+def generated_text(item) -> str:
+    if isinstance(item, dict):
+        return item.get("question") or item.get("question_text") or ""
+    return str(item)
@@ -0,0 +1,216 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import secrets
+from itertools import islice
+from typing import Dict, List
+from fastapi import UploadFile
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from services.passwords import hash_passwords
+import models
+
+ROSTER_BATCH_SIZE = int(os.getenv("ROSTER_BATCH_SIZE", "500"))
+ROSTER_READ_ROWS = 1000
+ROSTER_ROLES = ("student", "teacher")
+
+
+def _read_rows(rows, count: int) -> list:
+    return list(islice(rows, count))
+
+
+async def iter_roster_rows(upload: UploadFile):
+    """Yield (line_number, row dict or parse error) without reading the whole file."""
+    is_jsonl = (upload.filename or "").lower().endswith((".jsonl", ".ndjson"))
+    await upload.seek(0)
+    # newline="" so quoted fields keep their embedded line breaks
+    stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    if is_jsonl:
+        rows = enumerate(stream, 1)
+    else:
+        # one reader for the whole file: a quoted field may span several lines
+        reader = csv.reader(stream)
+        rows = ((reader.line_num, values) for values in reader)
+    header = None
+    try:
+        while True:
+            # the upload may have spilled to disk; read it in a worker thread
+            chunk = await asyncio.to_thread(_read_rows, rows, ROSTER_READ_ROWS)
+            if not chunk:
+                break
+            for line_number, values in chunk:
+                if is_jsonl:
+                    if not values.strip():
+                        continue
+                    try:
+                        row = json.loads(values)
+                    except json.JSONDecodeError as e:
+                        yield line_number, f"Invalid JSON: {e.msg}"
+                        continue
+                    yield line_number, row if isinstance(row, dict) else "Each line must be a JSON object"
+                elif not any(value.strip() for value in values):
+                    continue
+                elif header is None:
+                    header = [column.strip().lower() for column in values]
+                else:
+                    yield line_number, dict(zip(header, values))
+    finally:
+        # leave the upload's file open; FastAPI closes it after the request
+        stream.detach()
+
+
+def load_class_map(db: Session) -> Dict:
+    class_map = {}
+    for class_id, grade, section in db.execute(select(models.Class.id, models.Class.grade, models.Class.section)):
+        class_map[class_id] = class_id
+        class_map[(str(grade).strip().lower(), str(section).strip().lower())] = class_id
+    return class_map
+
+
+def _clean(row: dict, key: str) -> str:
+    value = row.get(key)
+    return str(value).strip() if value is not None else ""
+
+
+def validate_row(row: dict, class_map: Dict) -> dict:
+    name, email, role = _clean(row, "name"), _clean(row, "email").lower(), _clean(row, "role").lower()
+    if not name or not email or not role:
+        raise ValueError("name, email and role are required")
+    if len(name) > 50 or len(email) > 100:
+        raise ValueError("name or email is too long")
+    if role not in ROSTER_ROLES:
+        raise ValueError(f"role must be one of {', '.join(ROSTER_ROLES)}")
+
+    record = {"name": name, "email": email, "role": role, "password": _clean(row, "password")}
+    if role == "student":
+        class_id = _clean(row, "class_id")
+        if class_id:
+            key = int(class_id) if class_id.isdigit() else None
+        else:
+            key = (_clean(row, "grade").lower(), _clean(row, "section").lower())
+        if key not in class_map:
+            raise ValueError("class not found; give class_id or grade and section")
+        record["class_id"] = class_map[key]
+    else:
+        department, subject = _clean(row, "department"), _clean(row, "subject")
+        if not department or not subject:
+            raise ValueError("department and subject are required for teachers")
+        if len(department) > 10 or len(subject) > 10:
+            raise ValueError("department and subject must be at most 10 characters")
+        record["department"], record["subject"] = department, subject
+    return record
+
+
+def _username_candidates(record: dict) -> List[str]:
+    # the name is shown as-is when it's free; a second "Alex Kim" gets the email's
+    # local part appended, and the email itself (unique) is the last resort
+    name, email = record["name"], record["email"]
+    return [name, f"{name} ({email.split('@')[0]})"[:50], email if len(email) <= 50 else email[:50]]
+
+
+def _accept_batch(db: Session, batch: List[tuple], report: dict, claimed_names: set) -> List[tuple]:
+    emails = [record["email"] for _, record in batch]
+    candidates = {record["email"]: _username_candidates(record) for _, record in batch}
+    taken_emails = {email.lower() for email in db.scalars(select(models.User.email).where(models.User.email.in_(emails)))}
+    taken_names = set(db.scalars(
+        select(models.User.username)
+        .where(models.User.username.in_({name for names in candidates.values() for name in names}))
+    ))
+
+    accepted = []
+    for line_number, record in batch:
+        if record["email"] in taken_emails:
+            report["errors"].append({"line": line_number, "email": record["email"], "error": "User already exists"})
+            continue
+        username = next((name for name in candidates[record["email"]] if name not in taken_names and name not in claimed_names), None)
+        if username is None:
+            report["errors"].append({"line": line_number, "email": record["email"], "error": "No free username for this user"})
+            continue
+        claimed_names.add(username)
+        record["username"] = username
+        accepted.append((line_number, record))
+    # hashing comes next and takes a while; don't hold the connection through it
+    db.rollback()
+    return accepted
+
+
+def _insert_batch(db: Session, accepted: List[tuple], hashed: List[str], report: dict):
+    try:
+        db.execute(insert(models.User), [
+            {"username": record["username"], "email": record["email"], "hashed_password": password_hash, "role": record["role"]}
+            for (_, record), password_hash in zip(accepted, hashed)
+        ])
+        user_ids = dict(db.execute(
+            select(models.User.email, models.User.id)
+            .where(models.User.email.in_([record["email"] for _, record in accepted]))
+        ).all())
+        students = [
+            {"user_id": user_ids[record["email"]], "class_id": record["class_id"]}
+            for _, record in accepted if record["role"] == "student"
+        ]
+        teachers = [
+            {"user_id": user_ids[record["email"]], "department": record["department"], "subject": record["subject"]}
+            for _, record in accepted if record["role"] == "teacher"
+        ]
+        if students:
+            db.execute(insert(models.Student), students)
+        if teachers:
+            db.execute(insert(models.Teacher), teachers)
+        db.commit()
+    except Exception as e:
+        # one bad batch (e.g. a concurrent signup took an email) doesn't stop the import
+        db.rollback()
+        failed_lines = {line_number for line_number, _ in accepted}
+        report["temporary_passwords"] = [p for p in report["temporary_passwords"] if p["line"] not in failed_lines]
+        for line_number, record in accepted:
+            report["errors"].append({"line": line_number, "email": record["email"], "error": f"Batch insert failed: {str(e)}"})
+        return
+    report["created"] += len(accepted)
+
+
+async def write_batch(db: Session, batch: List[tuple], report: dict, claimed_names: set):
+    # lookups and inserts run in worker threads; only the hashing pool is awaited here
+    accepted = await asyncio.to_thread(_accept_batch, db, batch, report, claimed_names)
+    if not accepted:
+        return
+
+    passwords = []
+    for line_number, record in accepted:
+        if not record["password"]:
+            record["password"] = secrets.token_urlsafe(9)
+            report["temporary_passwords"].append(
+                {"line": line_number, "email": record["email"], "password": record["password"]}
+            )
+        passwords.append(record["password"])
+    hashed = await hash_passwords(passwords)
+    await asyncio.to_thread(_insert_batch, db, accepted, hashed, report)
+
+
+async def import_roster(db: Session, upload: UploadFile, batch_size: int = ROSTER_BATCH_SIZE) -> dict:
+    report = {"created": 0, "errors": [], "temporary_passwords": []}
+    class_map = await asyncio.to_thread(load_class_map, db)
+    seen_emails, claimed_names = set(), set()
+    batch = []
+    async for line_number, row in iter_roster_rows(upload):
+        if isinstance(row, str):
+            report["errors"].append({"line": line_number, "error": row})
+            continue
+        try:
+            record = validate_row(row, class_map)
+        except ValueError as e:
+            report["errors"].append({"line": line_number, "email": _clean(row, "email"), "error": str(e)})
+            continue
+        if record["email"] in seen_emails:
+            report["errors"].append({"line": line_number, "email": record["email"], "error": "Duplicate user in roster"})
+            continue
+        seen_emails.add(record["email"])
+        batch.append((line_number, record))
+        if len(batch) >= batch_size:
+            await write_batch(db, batch, report, claimed_names)
+            batch = []
+    if batch:
+        await write_batch(db, batch, report, claimed_names)
+    report["failed"] = len(report["errors"])
+    return report
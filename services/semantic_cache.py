@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "1") == "1"
+CHAT_CACHE_ROLES = tuple(r.strip() for r in os.getenv("CHAT_CACHE_ROLES", "student").split(",") if r.strip())
+# auto: local transformer model if it's already on disk, else the hashing embedder
+CHAT_CACHE_EMBEDDER = os.getenv("CHAT_CACHE_EMBEDDER", "auto")
+CHAT_CACHE_MODEL = os.getenv("CHAT_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+CHAT_CACHE_THRESHOLD = os.getenv("CHAT_CACHE_THRESHOLD")  # default depends on the embedder
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "86400"))
+CHAT_CACHE_MAX_BYTES = int(os.getenv("CHAT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_TOKEN_RE = re.compile(r"[a-z]+|\d+(?:\.\d+)?|[-+*/=^<>%]")
+_FILLER = frozenset("please can you could me tell explain what is are the a an simply simple in words".split())
+# numbers and operators decide which question it is ("solve 2x+3=7" vs "solve 2x+3=9"),
+# so their features outweigh the shared wording
+_EXACT_WEIGHT = 2.0
+
+
+class HashingEmbedder:
+    """Bag of words, word pairs and character trigrams hashed into a fixed vector."""
+
+    name = "hashing"
+    threshold = 0.8
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        tokens = [t for t in _TOKEN_RE.findall(text.lower()) if t not in _FILLER] or _TOKEN_RE.findall(text.lower())
+        words = [t for t in tokens if t.isalpha()]
+        exact = [t for t in tokens if not t.isalpha()]
+        features = [(word, 1.0) for word in words]
+        features += [(f"{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"#{word}#"
+            features += [(padded[i:i + 3], 1.0) for i in range(len(padded) - 2)]
+        features += [(token, _EXACT_WEIGHT) for token in exact]
+        features += [(f"{a} {b}", _EXACT_WEIGHT) for a, b in zip(tokens, tokens[1:]) if not (a.isalpha() and b.isalpha())]
+        if exact:
+            features.append(("=" + "".join(exact), 2 * _EXACT_WEIGHT))
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                # the sign bit keeps colliding features from always adding up
+                vectors[row, digest % self.dim] += weight if digest >> 63 else -weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class TransformerEmbedder:
+    """Mean-pooled sentence embeddings from a local transformers model on CPU."""
+
+    name = "transformers"
+    threshold = 0.9
+
+    def __init__(self, model_name: str = CHAT_CACHE_MODEL, local_files_only: bool = True):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=local_files_only)
+        self.model = AutoModel.from_pretrained(model_name, local_files_only=local_files_only)
+        self.model.eval()
+        self.dim = self.model.config.hidden_size
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        with self._torch.no_grad():
+            batch = self.tokenizer(texts, padding=True, truncation=True, max_length=128, return_tensors="pt")
+            output = self.model(**batch).last_hidden_state
+            mask = batch["attention_mask"].unsqueeze(-1).float()
+            pooled = (output * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = self._torch.nn.functional.normalize(pooled, dim=1)
+        return pooled.numpy().astype(np.float32)
+
+
+def build_embedder(kind: str = CHAT_CACHE_EMBEDDER):
+    if kind in ("auto", "transformers"):
+        try:
+            # "transformers" may download the model; "auto" only uses one already on disk
+            return TransformerEmbedder(local_files_only=kind == "auto")
+        except Exception as e:
+            print(f"Semantic cache using hashing embedder ({type(e).__name__}: {str(e)[:200]})")
+    return HashingEmbedder()
+
+
+class ScopeIndex:
+    """Vectors for one (role, grade) scope in a contiguous array, searched with one matmul."""
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.expires = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.entries: List[Tuple[str, str]] = []  # (question, answer)
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def entry_bytes(dim: int, question: str, answer: str) -> int:
+        return dim * 4 + 16 + len(question.encode()) + len(answer.encode())
+
+    def search(self, vector: np.ndarray, now: float) -> Tuple[int, float]:
+        n = len(self.entries)
+        if not n:
+            return -1, 0.0
+        scores = self.vectors[:n] @ vector
+        scores[self.expires[:n] <= now] = -1.0
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+    def add(self, vector: np.ndarray, question: str, answer: str, expires: float, now: float) -> int:
+        n = len(self.entries)
+        if n == len(self.vectors):
+            grow = len(self.vectors)
+            self.vectors = np.vstack([self.vectors, np.zeros((grow, self.vectors.shape[1]), dtype=np.float32)])
+            self.expires = np.concatenate([self.expires, np.zeros(grow)])
+            self.last_used = np.concatenate([self.last_used, np.zeros(grow)])
+        self.vectors[n] = vector
+        self.expires[n] = expires
+        self.last_used[n] = now
+        self.entries.append((question, answer))
+        size = self.entry_bytes(self.vectors.shape[1], question, answer)
+        self.bytes += size
+        return size
+
+    def remove(self, position: int) -> int:
+        # swap with the last entry so the arrays stay dense
+        last = len(self.entries) - 1
+        question, answer = self.entries[position]
+        size = self.entry_bytes(self.vectors.shape[1], question, answer)
+        if position != last:
+            self.vectors[position] = self.vectors[last]
+            self.expires[position] = self.expires[last]
+            self.last_used[position] = self.last_used[last]
+            self.entries[position] = self.entries[last]
+        self.entries.pop()
+        self.bytes -= size
+        return size
+
+
+class SemanticCache:
+    def __init__(self, embedder=None, threshold: Optional[float] = None, ttl: float = CHAT_CACHE_TTL,
+                 max_bytes: int = CHAT_CACHE_MAX_BYTES):
+        self._embedder = embedder
+        self._threshold = threshold
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.scopes: Dict[tuple, ScopeIndex] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hit_seconds = 0.0  # time spent answering hits (embedding + search)
+        self.miss_seconds = 0.0  # upstream model time for misses that were then stored
+        self.stored = 0
+        self._build_lock = threading.Lock()
+
+    @property
+    def embedder(self):
+        # the first access may import torch and load a model; lookups reach it via to_thread
+        if self._embedder is None:
+            with self._build_lock:
+                if self._embedder is None:
+                    self._embedder = build_embedder()
+        return self._embedder
+
+    @property
+    def threshold(self) -> float:
+        if self._threshold is None:
+            self._threshold = float(CHAT_CACHE_THRESHOLD) if CHAT_CACHE_THRESHOLD else self.embedder.threshold
+        return self._threshold
+
+    @staticmethod
+    def scope_key(role: str, grade: Optional[str]) -> tuple:
+        return role, (grade or "any").strip().lower()
+
+    async def embed(self, text: str) -> np.ndarray:
+        # model inference (and building the embedder on first use) is CPU-bound; keep it off the event loop
+        return (await asyncio.to_thread(lambda: self.embedder.embed([" ".join(text.split())])))[0]
+
+    async def lookup(self, role: str, grade: Optional[str], message: str):
+        """Return (answer, similarity, vector); answer is None on a miss."""
+        started = time.perf_counter()
+        vector = await self.embed(message)
+        scope = self.scopes.get(self.scope_key(role, grade))
+        now = time.monotonic()
+        if scope is not None:
+            position, score = scope.search(vector, now)
+            if position >= 0 and score >= self.threshold:
+                scope.last_used[position] = now
+                self.hits += 1
+                self.hit_seconds += time.perf_counter() - started
+                return scope.entries[position][1], score, vector
+        self.misses += 1
+        return None, 0.0, vector
+
+    def store(self, role: str, grade: Optional[str], message: str, answer: str, vector: np.ndarray, model_seconds: float = 0.0):
+        key = self.scope_key(role, grade)
+        scope = self.scopes.get(key)
+        if scope is None:
+            scope = self.scopes[key] = ScopeIndex(len(vector))
+        now = time.monotonic()
+        position, score = scope.search(vector, now)
+        if position >= 0 and score >= self.threshold:
+            return  # a concurrent miss already stored an equivalent answer
+        self.bytes += scope.add(vector, message, answer, now + self.ttl, now)
+        self.stored += 1
+        self.miss_seconds += model_seconds
+        self._evict(now)
+
+    def _evict(self, now: float):
+        for scope in self.scopes.values():
+            for position in reversed(np.flatnonzero(scope.expires[:len(scope)] <= now).tolist()):
+                self.bytes -= scope.remove(position)
+                self.evictions += 1
+        while self.bytes > self.max_bytes:
+            # least recently used entry across all scopes
+            victim, position = min(
+                ((scope, int(np.argmin(scope.last_used[:len(scope)]))) for scope in self.scopes.values() if len(scope)),
+                key=lambda pair: pair[0].last_used[pair[1]],
+            )
+            self.bytes -= victim.remove(position)
+            self.evictions += 1
+        for key in [key for key, scope in self.scopes.items() if not len(scope)]:
+            del self.scopes[key]
+
+    def clear(self):
+        self.scopes.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        avg_model = self.miss_seconds / self.stored if self.stored else None
+        avg_hit = self.hit_seconds / self.hits if self.hits else None
+        return {
+            "embedder": getattr(self._embedder, "name", None),
+            "threshold": self._threshold,
+            "entries": sum(len(scope) for scope in self.scopes.values()),
+            "scopes": len(self.scopes),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "avg_model_ms": avg_model * 1000 if avg_model is not None else None,
+            "avg_hit_ms": avg_hit * 1000 if avg_hit is not None else None,
+            # model time the hits didn't spend, net of their own lookup cost
+            "estimated_seconds_saved": (self.hits * avg_model - self.hit_seconds) if avg_model is not None else 0.0,
+        }
+
+
+chat_cache = SemanticCache()
+
+
+def cacheable(role: str, session) -> bool:
+    # follow-up turns depend on the conversation so far; only opening questions are shared
+    return CHAT_CACHE_ENABLED and role in CHAT_CACHE_ROLES and not session.turns and not session.summary_lines
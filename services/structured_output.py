@@ -0,0 +1,116 @@
+import json
+import re
+from typing import AsyncIterator, Callable, List, Optional, Type
+from pydantic import BaseModel, ValidationError
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_decoder = json.JSONDecoder()
+
+
+def strip_code_fences(text: str) -> str:
+    return _FENCE_RE.sub("", text.strip())
+
+
+class JsonArrayStream:
+    """Incremental parser for a top-level JSON array arriving in chunks.
+
+    feed() returns the elements completed by that chunk. Text before the
+    opening bracket (code fences, a stray preamble) is skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self.started = False
+        self.finished = False
+
+    def feed(self, chunk: str) -> List:
+        if self.finished:
+            return []
+        self._buffer += chunk
+        if not self.started:
+            start = self._buffer.find("[")
+            if start < 0:
+                return []
+            self.started = True
+            self._pos = start + 1
+        return self._drain(final=False)
+
+    def close(self) -> List:
+        """Flush the last element; raises ValueError if the array never closed."""
+        items = self._drain(final=True) if self.started else []
+        if not self.finished:
+            raise ValueError("Model output ended before the JSON array was closed")
+        return items
+
+    def _drain(self, final: bool) -> List:
+        items = []
+        buffer = self._buffer
+        while not self.finished:
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            self._pos = pos
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                self.finished = True
+                self._pos = pos + 1
+                break
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise ValueError(f"Malformed JSON array element at offset {pos}")
+                break
+            # a bare number at the end of the buffer may still be growing
+            if end >= len(buffer) and not final and not isinstance(item, (dict, list, str)):
+                break
+            items.append(item)
+            self._pos = end
+        # keep the buffer from growing with everything already parsed
+        if self._pos > 4096:
+            self._buffer = buffer[self._pos:]
+            self._pos = 0
+        return items
+
+
+def validate_item(item, model: Type[BaseModel], prepare: Optional[Callable] = None):
+    """Return (model instance, None) or (None, error message)."""
+    try:
+        if prepare:
+            item = prepare(item)
+        return model.model_validate(item), None
+    except (ValidationError, ValueError, TypeError) as e:
+        return None, str(e)
+
+
+def parse_json_array(text: str) -> List:
+    parser = JsonArrayStream()
+    return parser.feed(strip_code_fences(text)) + parser.close()
+
+
+def parse_items(text: str, model: Type[BaseModel], prepare: Optional[Callable] = None):
+    return [validate_item(item, model, prepare) for item in parse_json_array(text)]
+
+
+async def stream_items(chunks: AsyncIterator[str], model: Type[BaseModel], prepare: Optional[Callable] = None):
+    """Yield (index, model instance or None, error or None) as each array element completes."""
+    parser = JsonArrayStream()
+    index = 0
+    try:
+        async for chunk in chunks:
+            for item in parser.feed(chunk):
+                yield (index, *validate_item(item, model, prepare))
+                index += 1
+            if parser.finished:
+                break
+    finally:
+        # stop the upstream call as soon as the array is closed (or the client left)
+        if hasattr(chunks, "aclose"):
+            await chunks.aclose()
+    if not parser.finished:
+        for item in parser.close():
+            yield (index, *validate_item(item, model, prepare))
+            index += 1
+
@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+from fastapi import UploadFile
+
+UPLOAD_BACKEND = os.getenv("UPLOAD_BACKEND", "local")
+UPLOAD_ROOT = os.getenv("UPLOAD_ROOT", "uploads")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(50 * 1024 * 1024)))
+
+_SUFFIX_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StoredFile:
+    url: str
+    sha256: str
+    size: int
+    deduplicated: bool = False
+
+
+class LocalDiskStore:
+    """Content-addressed files under root/ab/cd/<sha256><suffix>."""
+
+    def __init__(self, root: str = UPLOAD_ROOT):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def _path_for(self, digest: str, suffix: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + suffix)
+
+    @staticmethod
+    def _write_chunk(handle, hasher, chunk: bytes):
+        hasher.update(chunk)
+        handle.write(chunk)
+
+    def _commit(self, tmp_path: str, digest: str, suffix: str):
+        final_path = self._path_for(digest, suffix)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+            return final_path, True
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        # atomic, so a concurrent upload of the same bytes can't see a partial file
+        os.replace(tmp_path, final_path)
+        return final_path, False
+
+    async def save(self, chunks: AsyncIterator[bytes], suffix: str = "") -> StoredFile:
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    # disk write and hashing both run off the event loop
+                    await asyncio.to_thread(self._write_chunk, handle, hasher, chunk)
+            final_path, deduplicated = await asyncio.to_thread(self._commit, tmp_path, hasher.hexdigest(), suffix)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return StoredFile(
+            url=final_path.replace(os.sep, "/"),
+            sha256=hasher.hexdigest(),
+            size=size,
+            deduplicated=deduplicated,
+        )
+
+
+class UploadBudget:
+    """Byte allowance shared by every file of one request."""
+
+    def __init__(self, max_bytes: int = UPLOAD_MAX_REQUEST_BYTES):
+        self.max_bytes = max_bytes
+        self.used = 0
+
+    def consume(self, size: int):
+        self.used += size
+        if self.used > self.max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {self.max_bytes} byte limit per request")
+
+
+def _suffix(filename: Optional[str]) -> str:
+    suffix = os.path.splitext(filename or "")[1].lower()
+    return suffix if _SUFFIX_RE.match(suffix) else ""
+
+
+async def _read_chunks(upload: UploadFile, budget: Optional[UploadBudget], max_file_bytes: int):
+    size = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        size += len(chunk)
+        if size > max_file_bytes:
+            raise UploadTooLarge(f"{upload.filename} exceeds the {max_file_bytes} byte limit per file")
+        if budget is not None:
+            budget.consume(len(chunk))
+        yield chunk
+
+
+_store = None
+
+
+def get_upload_store():
+    global _store
+    if _store is None:
+        if UPLOAD_BACKEND != "local":
+            raise ValueError(f"Unknown upload backend: {UPLOAD_BACKEND}")
+        _store = LocalDiskStore()
+    return _store
+
+
+async def save_upload(
+    upload: UploadFile,
+    budget: Optional[UploadBudget] = None,
+    max_file_bytes: int = UPLOAD_MAX_FILE_BYTES,
+) -> StoredFile:
+    return await get_upload_store().save(_read_chunks(upload, budget, max_file_bytes), _suffix(upload.filename))
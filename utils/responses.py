@@ -0,0 +1,41 @@
+import enum
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that skips jsonable_encoder; content must already be plain data."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def row_dicts(result) -> List[dict]:
+    # plain dicts from a column-only select, without building ORM objects
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+